@@ -7,4 +7,8 @@ load_dotenv()
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'faking.settings.production')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from votes.live import LiveProgressRouter  # noqa: E402 (requires the app registry)
+
+application = LiveProgressRouter(django_application)
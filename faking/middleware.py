@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import random
+import re
+import time
+
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.statements[fingerprint(sql)] += 1
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape, so that the queries of a N+1 loop look alike."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    sql = re.sub(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', '(...)', sql)
+    return sql
+
+
+def record(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_wrapper(sender, connection, **kwargs):
+    # the wrapper survives reconnects of the same connection object
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
+
+
+class QueryBudgetMiddleware:
+    """Count the queries and the SQL time of a sample of requests.
+
+    The figures are sent as a Server-Timing header. Requests above QUERY_BUDGET
+    queries are logged with their most repeated statements. The recorder lives in a
+    context variable, so queries of views served from the thread pool are counted too.
+    The middleware is async capable, so it does not pin ASGI requests to one thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark the instance as a coroutine function, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(install_wrapper, dispatch_uid='faking.middleware.install_wrapper')
+        for connection in connections.all():
+            install_wrapper(None, connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.process(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.process(request, response, recorder, time.perf_counter() - start)
+
+    def process(self, request, response, recorder, total):
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+        if recorder.count > settings.QUERY_BUDGET:
+            match = request.resolver_match
+            repeated = [
+                f"{count}x {statement}"
+                for statement, count in recorder.statements.most_common(3)
+                if count > 1
+            ]
+            logger.warning(
+                "%s %s (%s) ran %d queries in %.1f ms, budget is %d\n%s",
+                request.method,
+                request.path,
+                match.view_name if match else '-',
+                recorder.count,
+                recorder.duration * 1000,
+                settings.QUERY_BUDGET,
+                "\n".join(repeated),
+            )
+
+        return response
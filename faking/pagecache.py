@@ -0,0 +1,159 @@
+"""Full-page cache for views which render the same page for every anonymous visitor.
+
+Pages with a form contain the CSRF token of the visitor, which is replaced by a
+placeholder in the cached copy and filled in with a fresh token on every hit. All
+pages are invalidated together by bumping the ``pages`` namespace of ``votes.caching``,
+e.g. with ``python manage.py page_cache --clear`` after a deployment.
+"""
+import hashlib
+import re
+import threading
+import time
+
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import URLResolver, get_resolver
+from django.utils.http import urlencode
+
+from votes import caching
+
+CSRF_PLACEHOLDER = b'__csrf_token__'
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([a-zA-Z0-9]+)"')
+
+
+def is_anonymous(request):
+    # without a session there is no user and no pending message, and no query is needed to find out
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES and 'messages' not in request.COOKIES
+
+
+def counter_key(view_name, outcome):
+    return f'pagecache:{outcome}:{view_name}'
+
+
+# hits and misses of this process which are not added to the shared counters yet
+_counts = Counter()
+_lock = threading.Lock()
+_flushed = time.monotonic()
+
+
+def count(view_name, outcome):
+    """Count a hit or miss, written to the cache at most every PAGE_CACHE_STATS_INTERVAL seconds.
+
+    Writing every count would cost a cache write per cached page, with the file based
+    cache even a scan of the cache directory, which is most of what serving it saves.
+    """
+    global _flushed
+    with _lock:
+        _counts[counter_key(view_name, outcome)] += 1
+        if time.monotonic() - _flushed < settings.PAGE_CACHE_STATS_INTERVAL:
+            return
+        _flushed = time.monotonic()
+    flush_stats()
+
+
+def flush_stats():
+    """Add the counts of this process to the counters shared by all processes."""
+    with _lock:
+        counts = dict(_counts)
+        _counts.clear()
+    for key, value in counts.items():
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.set(key, value, None)
+
+
+def get_cached_views(resolver=None, namespace=None):
+    """Yield the names of all URL patterns served by cache_anonymous views."""
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from get_cached_views(pattern, pattern.namespace or namespace)
+        elif getattr(pattern.callback, 'page_cached', False):
+            yield f"{namespace}:{pattern.name}" if namespace else pattern.name
+
+
+def get_stats():
+    """Return the hits and misses per cached view since the counters were reset.
+
+    Other processes add theirs every PAGE_CACHE_STATS_INTERVAL seconds, so their latest counts may be missing.
+    """
+    flush_stats()
+    names = list(get_cached_views())
+    counts = cache.get_many([counter_key(name, outcome) for name in names for outcome in ['hits', 'misses']])
+    return {
+        name: {outcome: counts.get(counter_key(name, outcome), 0) for outcome in ['hits', 'misses']}
+        for name in names
+    }
+
+
+def reset_stats():
+    with _lock:
+        _counts.clear()
+    cache.delete_many([counter_key(name, outcome) for name in get_cached_views() for outcome in ['hits', 'misses']])
+
+
+def cache_anonymous(view, query=None):
+    """Serve GET requests of anonymous visitors from the cache for PAGE_CACHE_TIMEOUT seconds.
+
+    ``query`` maps the query parameters which change the page to their valid values. Requests
+    with any other parameter or value are not cached, so visitors cannot fill the cache with
+    made up query strings.
+    """
+    query = {name: set(values) for name, values in (query or {}).items()}
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not is_anonymous(request):
+            return view(request, *args, **kwargs)
+        if not all(name in query and set(values) <= query[name] for name, values in request.GET.lists()):
+            return view(request, *args, **kwargs)
+
+        view_name = request.resolver_match.view_name
+        # the order of the parameters does not make a different page
+        url = f"{request.path}?{urlencode(sorted(request.GET.lists()), doseq=True)}"
+        digest = hashlib.md5(url.encode()).hexdigest()
+        key = caching.make_key(['pages'], view_name, digest)
+
+        cached = cache.get(key)
+        if cached is not None:
+            count(view_name, 'hits')
+            content, content_type = cached
+            if CSRF_PLACEHOLDER in content:
+                content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'HIT'
+            return response
+
+        count(view_name, 'misses')
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+
+        cacheable = (
+            request.method == 'GET'
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.session.modified
+        )
+        if cacheable:
+            content = response.content
+            if request.META.get('CSRF_COOKIE_USED'):
+                match = CSRF_INPUT.search(content)
+                # a token outside of a form field could not be replaced reliably
+                cacheable = match is not None
+                if match:
+                    content = content.replace(match.group(1), CSRF_PLACEHOLDER)
+        if cacheable:
+            cache.set(key, (content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+
+        response['X-Page-Cache'] = 'MISS'
+        return response
+
+    wrapper.page_cached = True
+    return wrapper
@@ -11,8 +11,9 @@ SECRET_KEY = os.environ['SECRET_KEY']
 # Application definition
 
 INSTALLED_APPS = [
-    'mentoring',
-    'votes',
+    'mentoring.apps.MentoringConfig',
+    'outbox',
+    'votes.apps.VotesConfig',
 
     'django.contrib.admin',
     'django.contrib.auth',
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'faking.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -32,6 +34,20 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Page cache: pages for anonymous visitors are cached this many seconds, see faking.pagecache
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Page cache statistics: the hits and misses of each process are added to the shared counters every this many seconds
+
+PAGE_CACHE_STATS_INTERVAL = 60
+
+# Query budget: requests above QUERY_BUDGET queries are logged, only a sample is measured
+
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '30'))
+
+QUERY_BUDGET_SAMPLE_RATE = float(os.getenv('QUERY_BUDGET_SAMPLE_RATE', '0.01'))
+
 ROOT_URLCONF = 'faking.urls'
 
 TEMPLATES = [
@@ -67,6 +83,17 @@ DATABASES = {
 }
 
 
+# Cache: django.core.cache.backends.locmem.LocMemCache, django.core.cache.backends.filebased.FileBasedCache
+# or django_redis.cache.RedisCache with a location like redis://host:6379/0
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Email
 
 EMAIL_USE_TLS = True
@@ -123,6 +150,12 @@ STATICFILES_DIRS = [
     BASE_DIR / 'faking' / 'static',
 ]
 
+# Generated static files like the purged stylesheet, see the purge_css command
+STATIC_BUILD_DIR = BASE_DIR / 'build' / 'static'
+
+# Inline SVG sprite of the used icons, see the build_icons command
+ICON_SPRITE = BASE_DIR / 'build' / 'icons.svg'
+
 MEDIA_URL = '/media/'
 
 
@@ -5,6 +5,8 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['*']
 
+QUERY_BUDGET_SAMPLE_RATE = 1.0
+
 
 # Database
 
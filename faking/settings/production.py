@@ -15,9 +15,26 @@ ADMINS = [('Fachschaftsrat Maschinenbau', 'farafmb@ovgu.de')]
 
 STATIC_ROOT = BASE_DIR / 'data' / 'static'
 
+# The purged stylesheet shadows the full one
+STATICFILES_DIRS = [STATIC_BUILD_DIR] + STATICFILES_DIRS
+
+STATICFILES_STORAGE = 'faking.storage.CompressedManifestStaticFilesStorage'
+
 MEDIA_ROOT = BASE_DIR / 'data' / 'media'
 
 
+# Cache: shared by all worker processes, so invalidations reach every one of them
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'data' / 'cache')),
+        # the default of 300 entries would cull cached pages and versions long before the disk fills up
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+    }
+}
+
+
 # Secure Connections
 
 SECURE_HSTS_SECONDS = 31536000
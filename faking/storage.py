@@ -0,0 +1,52 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # only .gz siblings are written without it
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Store static files under content hashed names with precompressed siblings.
+
+    The .gz and .br files next to the hashed files are served as they are by nginx
+    (``gzip_static`` and ``brotli_static``), so nothing is compressed per request.
+    """
+    compressible = ('.css', '.js', '.svg', '.map', '.txt', '.json')
+    min_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        # stylesheets are hashed in several passes, only the final names are kept
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if hashed_name.endswith(self.compressible):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        path = self.path(name)
+        suffixes = ['.gz', '.br'] if brotli is not None else ['.gz']
+        # the name contains the content hash, so existing siblings are up to date
+        missing = [suffix for suffix in suffixes if not os.path.exists(path + suffix)]
+        if not missing:
+            return
+
+        with open(path, 'rb') as file:
+            content = file.read()
+        if len(content) < self.min_size:
+            return
+
+        for suffix in missing:
+            if suffix == '.gz':
+                compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            else:
+                compressed = brotli.compress(content)
+            # skip files which barely shrink
+            if len(compressed) < len(content) * 0.95:
+                with open(path + suffix, 'wb') as file:
+                    file.write(compressed)
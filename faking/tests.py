@@ -0,0 +1,397 @@
+import asyncio
+import gzip
+import re
+import socketserver
+import tempfile
+import threading
+import time
+
+from io import StringIO
+
+import brotli
+from asgiref.sync import async_to_sync
+from django_redis.cache import RedisCache
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import path, reverse
+
+from mentoring.models import Program
+from votes import caching
+from votes.models import Membership, Team
+from votes.views import async_view
+
+from .middleware import QueryRecorder, fingerprint, install_wrapper
+from .pagecache import counter_key, get_stats, reset_stats
+from .storage import CompressedManifestStaticFilesStorage
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user')
+        for i in range(3):
+            team = Team.objects.create(name=f"Team {i}", slug=f'team-{i}')
+            Membership.objects.create(team=team, user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @override_settings(QUERY_BUDGET_SAMPLE_RATE=1.0)
+    def test_server_timing(self):
+        response = self.client.get(reverse('votes:decisions'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+    @override_settings(QUERY_BUDGET_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(reverse('votes:decisions'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(QUERY_BUDGET_SAMPLE_RATE=1.0, QUERY_BUDGET=1)
+    def test_requests_above_budget_are_logged(self):
+        with self.assertLogs('faking.middleware', 'WARNING') as logs:
+            self.client.get(reverse('votes:teams'))
+
+        self.assertIn("GET /votes/teams/ (votes:teams)", logs.output[0])
+
+    @override_settings(QUERY_BUDGET_SAMPLE_RATE=1.0)
+    def test_within_budget_is_not_logged(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('faking.middleware', 'WARNING'):
+                self.client.get(reverse('votes:decisions'))
+
+    def test_repeated_statements(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for user_id in range(3):
+                User.objects.filter(pk=user_id).exists()
+
+        self.assertEqual(recorder.count, 3)
+        [(statement, count)] = recorder.statements.most_common()
+        self.assertEqual(count, 3)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "t"."id" IN (%s, %s, %s) AND "t"."name" = \'x\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "t"."id" IN (...) AND "t"."name" = ? LIMIT ?',
+        )
+
+
+def slow_view(request):
+    time.sleep(0.3)
+    return HttpResponse("ok")
+
+
+urlpatterns = [
+    path('slow/', async_view(slow_view)),
+]
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=1.0)
+class QueryBudgetAsyncTests(TransactionTestCase):
+    def test_queries_of_pooled_views_are_counted(self):
+        self.async_client.force_login(User.objects.create_user('user'))
+        # a server process opens its connections after loading the middleware, the test database
+        # connection of the main thread, which runs the thread sensitive code, is older
+        install_wrapper(None, connection)
+
+        async def request():
+            return await self.async_client.get(reverse('votes:decisions'))
+
+        response = async_to_sync(request)()
+        count = int(re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+        # session, user, decisions and teams of the navigation
+        self.assertGreaterEqual(count, 4)
+
+    @override_settings(ROOT_URLCONF='faking.tests')
+    def test_concurrent_requests_are_not_serialized(self):
+        async def requests():
+            return await asyncio.gather(*(self.async_client.get('/slow/') for _ in range(4)))
+
+        start = time.perf_counter()
+        responses = async_to_sync(requests)()
+        duration = time.perf_counter() - start
+
+        for response in responses:
+            self.assertIn('Server-Timing', response)
+        # one after another they would take 1.2 s
+        self.assertLess(duration, 0.9)
+
+
+class CompressedManifestStaticFilesStorageTests(TestCase):
+    def test_collectstatic(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            STATIC_ROOT=directory,
+            STATICFILES_STORAGE='faking.storage.CompressedManifestStaticFilesStorage',
+        ):
+            call_command('collectstatic', '--no-input', verbosity=0)
+            storage = CompressedManifestStaticFilesStorage()
+            name = storage.stored_name('faking/css/bulma.min.css')
+
+            self.assertRegex(name, r'^faking/css/bulma\.min\.[0-9a-f]{12}\.css$')
+            with open(storage.path(name), 'rb') as file:
+                content = file.read()
+            with open(storage.path(name) + '.gz', 'rb') as file:
+                self.assertEqual(gzip.decompress(file.read()), content)
+            with open(storage.path(name) + '.br', 'rb') as file:
+                self.assertEqual(brotli.decompress(file.read()), content)
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """Enough of the Redis protocol for django-redis, with the data in a dict."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RedisStandInHandler)
+        self.data = {}
+        self.expiries = {}
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def location(self):
+        return 'redis://127.0.0.1:{}/1'.format(self.server_address[1])
+
+    def execute(self, command, *args):
+        now = time.monotonic()
+        for key, expiry in list(self.expiries.items()):
+            if expiry <= now:
+                self.data.pop(key, None)
+                del self.expiries[key]
+
+        if command == b'SELECT':
+            return '+OK'
+        if command == b'GET':
+            return self.data.get(args[0])
+        if command == b'MGET':
+            return [self.data.get(key) for key in args]
+        if command == b'SET':
+            key, value, *options = args
+            if b'NX' in options and key in self.data:
+                return None
+            self.data[key] = value
+            self.expiries.pop(key, None)
+            if b'PX' in options:
+                self.expiries[key] = now + int(options[options.index(b'PX') + 1]) / 1000
+            return '+OK'
+        if command == b'EXISTS':
+            return sum(key in self.data for key in args)
+        if command == b'DEL':
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if command == b'INCRBY':
+            value = int(self.data.get(args[0], 0)) + int(args[1])
+            self.data[args[0]] = str(value).encode()
+            return value
+        if command == b'EVAL' and b"redis.call('EXISTS', KEYS[1])" in args[0]:
+            # the incr script of django-redis, atomic under the lock of the server
+            key, delta = args[2], args[3]
+            return self.execute(b'INCRBY', key, delta) if key in self.data else None
+        if command == b'PEXPIRE':
+            if args[0] not in self.data:
+                return 0
+            self.expiries[args[0]] = now + int(args[1]) / 1000
+            return 1
+        if command == b'PERSIST':
+            return int(self.expiries.pop(args[0], None) is not None)
+        if command == b'FLUSHDB':
+            self.data.clear()
+            self.expiries.clear()
+            return '+OK'
+        return f'-ERR unknown command {command.decode()}'
+
+
+class RedisStandInHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            with self.server.lock:
+                reply = self.server.execute(args[0].upper(), *args[1:])
+            self.wfile.write(self.encode(reply))
+
+    def encode(self, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, str):
+            return reply.encode() + b'\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(self.encode(item) for item in reply)
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class RedisCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RedisStandIn()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.location, {})
+        self.addCleanup(self.cache.close)
+        self.addCleanup(self.cache.clear)
+
+    def test_operations(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+        self.cache.set('roster', [(1, "Max Muster")])
+        self.assertEqual(self.cache.get('roster'), [(1, "Max Muster")])
+        self.assertFalse(self.cache.add('roster', []))
+        self.assertTrue(self.cache.add('other', True))
+        self.assertIs(self.cache.get('other'), True)
+        self.assertEqual(self.cache.get_many(['roster', 'other', 'missing']), {
+            'roster': [(1, "Max Muster")],
+            'other': True,
+        })
+
+        self.cache.set('version', 7, None)
+        self.assertEqual(self.cache.incr('version'), 8)
+        self.assertEqual(self.cache.decr('version', 3), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+        self.assertTrue(self.cache.delete('roster'))
+        self.assertFalse(self.cache.has_key('roster'))
+        self.cache.delete_many(['other', 'version'])
+        self.assertEqual(self.cache.get_many(['other', 'version']), {})
+
+    def test_timeouts(self):
+        self.cache.set('short', 1, 0.05)
+        self.cache.set('gone', 1, 0)
+        self.assertEqual(self.cache.get('short'), 1)
+        self.assertFalse(self.cache.has_key('gone'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+
+        self.cache.set('touched', 1, 0.05)
+        self.assertTrue(self.cache.touch('touched', None))
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get('touched'), 1)
+
+    def test_connection_outlives_requests(self):
+        connections = self.server.connections
+        for _ in range(3):
+            self.cache.get('roster')
+            # sent at the end of every request
+            self.cache.close()
+        self.assertLessEqual(self.server.connections, connections + 1)
+
+    def test_invalidation_across_processes(self):
+        other = RedisCache(self.server.location, {})
+        self.addCleanup(other.close)
+
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': self.server.location,
+        }}):
+            key = caching.make_key(['teams'], 'list')
+            other.set(key, ["Team"])
+            Team.objects.create(name="Neu", slug='neu')
+            # the value cached by the other process is out of reach
+            self.assertIsNone(other.get(caching.make_key(['teams'], 'list')))
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.program = Program.objects.create(faculty=Program.FMB, name="Maschinenbau (B.Sc.)")
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_anonymous_hits(self):
+        self.assertEqual(self.client.get(reverse('landing_page'))['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('landing_page'))
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertContains(response, 'fas-vote-yea')
+
+    def test_users_are_not_cached(self):
+        self.client.force_login(User.objects.create_user('user'))
+        self.client.get(reverse('landing_page'))
+        self.assertFalse(self.client.get(reverse('landing_page')).has_header('X-Page-Cache'))
+
+    def test_csrf_token_is_injected(self):
+        url = reverse('mentoring:mentor-create')
+        tokens = []
+        for outcome in ['MISS', 'HIT', 'HIT']:
+            client = Client(enforce_csrf_checks=True)
+            response = client.get(url)
+            self.assertEqual(response['X-Page-Cache'], outcome)
+            self.assertNotContains(response, '__csrf_token__')
+            tokens.append(re.search(r'name="csrfmiddlewaretoken" value="(\w+)"', response.content.decode()).group(1))
+
+        self.assertEqual(len(set(tokens)), 3)
+        response = client.post(url, {
+            'csrfmiddlewaretoken': tokens[-1],
+            'first_name': "max",
+            'last_name': "muster",
+            'email': "max.muster@st.ovgu.de",
+            'phone': "+49 391 123456",
+            'program': self.program.pk,
+            'privacy': 'on',
+        })
+        self.assertRedirects(response, reverse('mentoring:mentor-success'), fetch_redirect_response=False)
+
+    def test_invalidation(self):
+        url = reverse('mentoring:mentor-create')
+        self.client.get(url)
+        Program.objects.create(faculty=Program.FMB, name="Mechatronik (B.Sc.)")
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, "Mechatronik")
+
+        # a different faculty is a different page
+        self.assertEqual(self.client.get(url, {'faculty': Program.FMB})['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, {'faculty': Program.FMB})['X-Page-Cache'], 'HIT')
+
+        call_command('page_cache', '--clear', stdout=StringIO())
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+
+    def test_unknown_query_is_not_cached(self):
+        url = reverse('mentoring:mentor-create')
+        for query in [{'utm_source': 'mail'}, {'faculty': 'XYZ'}, {'faculty': [Program.FMB, 'XYZ']}]:
+            self.client.get(url, query)
+            self.assertFalse(self.client.get(url, query).has_header('X-Page-Cache'))
+
+    @override_settings(PAGE_CACHE_STATS_INTERVAL=3600)
+    def test_counts_are_buffered(self):
+        for _ in range(3):
+            self.client.get(reverse('votes:registration-done'))
+
+        self.assertIsNone(cache.get(counter_key('votes:registration-done', 'hits')))
+        self.assertEqual(get_stats()['votes:registration-done'], {'hits': 2, 'misses': 1})
+        self.assertEqual(cache.get(counter_key('votes:registration-done', 'hits')), 2)
+
+    def test_stats(self):
+        for _ in range(3):
+            self.client.get(reverse('votes:registration-done'))
+
+        self.assertEqual(get_stats()['votes:registration-done'], {'hits': 2, 'misses': 1})
+        self.assertEqual(get_stats()['mentoring:mentor-success'], {'hits': 0, 'misses': 0})
+
+        stdout = StringIO()
+        call_command('page_cache', '--reset', stdout=stdout)
+        self.assertRegex(stdout.getvalue(), r'votes:registration-done +2 hits +1 misses +66\.7%')
+        self.assertEqual(get_stats()['votes:registration-done'], {'hits': 0, 'misses': 0})
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MentoringConfig(AppConfig):
     name = 'mentoring'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from votes import caching
+
+from .models import Program
+
+
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+def invalidate_pages(sender, **kwargs):
+    # the programs are listed in the cached registration form
+    caching.bump('pages')
@@ -1,9 +1,16 @@
 from django.urls import path
 
+from faking.pagecache import cache_anonymous
+
 from . import views
+from .models import Program
 
 app_name = 'mentoring'
 urlpatterns = [
-    path('', views.MentorCreate.as_view(), name='mentor-create'),
-    path('success/', views.MentorSuccess.as_view(), name='mentor-success'),
+    path(
+        '',
+        cache_anonymous(views.MentorCreate.as_view(), query={'faculty': [faculty for faculty, _ in Program.FACULTIES]}),
+        name='mentor-create',
+    ),
+    path('success/', cache_anonymous(views.MentorSuccess.as_view()), name='mentor-success'),
 ]
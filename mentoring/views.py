@@ -1,6 +1,8 @@
-from django.core.mail import send_mail
+from django.db import transaction
 from django.views import generic
 
+from outbox.models import Message
+
 from .forms import MentorForm
 
 
@@ -22,9 +24,11 @@ class MentorCreate(generic.CreateView):
         return kwargs
     
     def form_valid(self, form):
-        send_mail(
-            "Bestätigung deiner Registrierung",
-            """Hallo %(first_name)s,
+        with transaction.atomic():
+            response = super().form_valid(form)
+            Message.objects.enqueue(
+                "Bestätigung deiner Registrierung",
+                """Hallo %(first_name)s,
 
 hiermit bestätigen wir deine Registrierung als Mentor:in. 
 Wir werden dich erneut kontaktieren sobald es die ersten 
@@ -32,10 +36,10 @@ Informationen zur Mentoring-Schulung gibt.
 
 Viele Grüße
 Dein Fachschaftsrat""" % form.cleaned_data,
-            None,
-            [form.cleaned_data['email']]
-        )
-        return super().form_valid(form)
+                None,
+                [form.cleaned_data['email']]
+            )
+        return response
 
 
 class MentorSuccess(generic.TemplateView):
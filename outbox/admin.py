@@ -0,0 +1,15 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Message
+
+
+@admin.register(Message)
+class MessageAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt', 'created', 'sent')
+    list_filter = ('status', )
+    actions = ['retry']
+
+    def retry(self, request, queryset):
+        queryset.exclude(status=Message.SENT).update(status=Message.QUEUED, attempts=0, next_attempt=timezone.now())
+    retry.short_description = "Erneut versenden"
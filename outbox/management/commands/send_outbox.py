@@ -0,0 +1,100 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+from outbox.models import Message
+
+
+class Command(BaseCommand):
+    help = "Send queued emails in batches over a single connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help="Maximum number of messages sent over one connection (default: 50).",
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help="Give up on a message after this many failed attempts (default: 5).",
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=60,
+            help="Seconds to wait before the first retry, doubled on every further attempt (default: 60).",
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=300,
+            help="Seconds a batch stays reserved for this worker, longer than sending it takes (default: 300).",
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep running and poll for new messages.",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help="Seconds to wait between two polls in loop mode (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.send_batch(
+                options['batch_size'], options['max_attempts'], options['backoff'], options['lease'],
+            )
+            if sent or failed or options['verbosity'] > 1:
+                self.stdout.write(f"Sent {sent} and failed to send {failed} message(s).")
+
+            if not options['loop']:
+                break
+
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
+
+    def send_batch(self, batch_size, max_attempts, backoff, lease):
+        sent = failed = 0
+
+        # no transaction is open while talking to the mail relay, every message is
+        # marked as sent or failed on its own
+        messages = Message.objects.claim(batch_size, lease)
+        if not messages:
+            return sent, failed
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            for message in messages:
+                message.mark_failed(error, max_attempts, backoff)
+            return sent, len(messages)
+
+        try:
+            for message in messages:
+                email = EmailMessage(
+                    message.subject,
+                    message.body,
+                    message.from_email or None,
+                    message.recipients,
+                    connection=connection,
+                )
+                try:
+                    email.send()
+                except Exception as error:
+                    message.mark_failed(error, max_attempts, backoff)
+                    failed += 1
+                else:
+                    message.mark_sent()
+                    sent += 1
+        finally:
+            connection.close()
+
+        return sent, failed
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.utils import timezone
+
+
+class MessageQuerySet(models.QuerySet):
+    def enqueue(self, subject, message, from_email, recipient_list):
+        """Queue an email with the same arguments as send_mail().
+
+        The message is stored within the current transaction and delivered later by the
+        send_outbox command, so the request never waits for the mail relay.
+        """
+        return self.create(
+            subject=subject,
+            body=message,
+            from_email=from_email or "",
+            recipients=list(recipient_list),
+        )
+
+    def due(self, now=None):
+        return self.filter(status=Message.QUEUED, next_attempt__lte=now or timezone.now())
+
+    def claim(self, batch_size, lease):
+        """Reserve a batch of due messages for one worker for ``lease`` seconds.
+
+        The rows are only locked while they are claimed, not while the messages are sent.
+        Claimed messages are not due until the lease ends, so messages of a worker which
+        died on the way are sent again afterwards.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            # concurrent workers skip the messages locked by this one
+            messages = list(self.due(now).select_for_update(skip_locked=True).order_by('next_attempt')[:batch_size])
+            self.filter(pk__in=[message.pk for message in messages]).update(
+                next_attempt=now + timedelta(seconds=lease),
+            )
+        return messages
+
+
+class Message(models.Model):
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, "Wartend"),
+        (SENT, "Versendet"),
+        (FAILED, "Fehlgeschlagen"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=6, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    objects = MessageQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.subject}"
+
+    def mark_sent(self):
+        # the body may contain credentials, it is not kept once delivered
+        self.status = self.SENT
+        self.body = ""
+        self.sent = timezone.now()
+        self.last_error = ""
+        self.save(update_fields=['status', 'body', 'sent', 'last_error'])
+
+    def mark_failed(self, error, max_attempts, backoff):
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= max_attempts:
+            # like a delivered one, a message given up on keeps no credentials
+            self.status = self.FAILED
+            self.body = ""
+        else:
+            # exponential backoff: backoff, 2 * backoff, 4 * backoff, ...
+            self.next_attempt = timezone.now() + timedelta(seconds=backoff * 2 ** (self.attempts - 1))
+        self.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt', 'body'])
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
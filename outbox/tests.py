@@ -0,0 +1,79 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Message
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("relay unavailable")
+
+
+class ClaimCheckingBackend(EmailBackend):
+    due_while_sending = []
+
+    def send_messages(self, messages):
+        self.due_while_sending.append(Message.objects.due().count())
+        return super().send_messages(messages)
+
+
+class SendOutboxTests(TestCase):
+    def test_enqueue_does_not_send(self):
+        Message.objects.enqueue("Betreff", "Text", None, ["max@st.ovgu.de"])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_batch_is_sent_and_body_dropped(self):
+        for i in range(3):
+            Message.objects.enqueue("Betreff", f"Text {i}", None, [f"max{i}@st.ovgu.de"])
+
+        call_command('send_outbox', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[2].to, ["max2@st.ovgu.de"])
+        self.assertFalse(Message.objects.exclude(status=Message.SENT).exists())
+        self.assertFalse(Message.objects.exclude(body="").exists())
+
+    @override_settings(EMAIL_BACKEND='outbox.tests.FailingBackend')
+    def test_failed_messages_are_retried_with_backoff(self):
+        message = Message.objects.enqueue("Betreff", "Text", None, ["max@st.ovgu.de"])
+
+        call_command('send_outbox', '--backoff', '60', '--max-attempts', '2', stdout=StringIO())
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (Message.QUEUED, 1))
+        self.assertGreater(message.next_attempt, timezone.now())
+
+        # not due yet
+        call_command('send_outbox', '--max-attempts', '2', stdout=StringIO())
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+
+        Message.objects.update(next_attempt=timezone.now())
+        call_command('send_outbox', '--max-attempts', '2', stdout=StringIO())
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (Message.FAILED, 2))
+        self.assertIn("relay unavailable", message.last_error)
+        self.assertEqual(message.body, "")
+
+    @override_settings(EMAIL_BACKEND='outbox.tests.ClaimCheckingBackend')
+    def test_batch_is_claimed_before_sending(self):
+        for i in range(2):
+            Message.objects.enqueue("Betreff", f"Text {i}", None, [f"max{i}@st.ovgu.de"])
+
+        call_command('send_outbox', stdout=StringIO())
+        # a concurrent worker would not pick the messages up while they are sent
+        self.assertEqual(ClaimCheckingBackend.due_while_sending, [0, 0])
+
+    def test_expired_claims_are_due_again(self):
+        Message.objects.enqueue("Betreff", "Text", None, ["max@st.ovgu.de"])
+        [message] = Message.objects.claim(10, lease=60)
+
+        self.assertFalse(Message.objects.claim(10, lease=60))
+        self.assertEqual(Message.objects.due(timezone.now() + timedelta(seconds=61)).get(), message)
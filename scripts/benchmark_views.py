@@ -0,0 +1,78 @@
+"""Measure throughput and latency of pages under concurrent load.
+
+Start the site with an ASGI server, log in and pass the session cookie:
+
+    uvicorn faking.asgi:application --port 8000
+    python scripts/benchmark_views.py --session <sessionid> /votes/ /votes/1/ /votes/1/vote/
+
+Run it against two revisions to compare them, e.g. before and after a change.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from urllib.parse import urlsplit
+
+
+async def fetch(host, port, path, cookie):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        f"Cookie: {cookie}\r\n"
+        f"Connection: close\r\n\r\n"
+    )
+    writer.write(request.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def run(base, path, cookie, requests, concurrency):
+    url = urlsplit(base)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            status = await fetch(url.hostname, url.port or 80, path, cookie)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'rps': requests / elapsed,
+        'p50': quantiles[49] * 1000,
+        'p95': quantiles[94] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--base', default='http://127.0.0.1:8000')
+    parser.add_argument('--session', default='', help="Value of the sessionid cookie.")
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+
+    cookie = f"sessionid={args.session}"
+    for path in args.paths:
+        result = asyncio.run(run(args.base, path, cookie, args.requests, args.concurrency))
+        print(f"{path:30} {result['rps']:8.1f} req/s  p50 {result['p50']:7.1f} ms  "
+              f"p95 {result['p95']:7.1f} ms  {result['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
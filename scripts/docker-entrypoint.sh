@@ -9,6 +9,9 @@ done
 echo "Postgres started"
 
 python manage.py migrate
-python manage.py collectstatic --no-input --clear
+# copies only changed files, or nothing if the volume matches the image
+python manage.py sync_static --no-input --sources build/static-sources.json
+# cached pages may refer to templates and static files of the previous release
+python manage.py page_cache --clear
 
 exec "$@"
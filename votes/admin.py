@@ -1,21 +1,86 @@
 from django.contrib import admin
 
-from .models import Decision, Option, Vote, Team, Invitation, Membership
+from .models import Decision, Option, OptionTemplate, Vote, Team, Invitation, Membership, Snapshot
+
+
+class DiscardSnapshotMixin:
+    """Discard the result snapshot of the decision an edited object belongs to.
+
+    ``decision_path`` is the lookup from the object to its decision, empty for decisions.
+    """
+    decision_path = ''
+
+    def get_decision(self, obj):
+        for name in filter(None, self.decision_path.split('__')):
+            obj = getattr(obj, name)
+        return obj
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.get_decision(obj).discard_snapshot()
+
+    def delete_model(self, request, obj):
+        decision = self.get_decision(obj)
+        super().delete_model(request, obj)
+        decision.discard_snapshot()
+
+    def delete_queryset(self, request, queryset):
+        decisions = list(Decision.objects.filter(pk__in=queryset.values(self.decision_path or 'pk')))
+        super().delete_queryset(request, queryset)
+        for decision in decisions:
+            decision.discard_snapshot()
 
 
 @admin.register(Decision)
-class DecisionAdmin(admin.ModelAdmin):
+class DecisionAdmin(DiscardSnapshotMixin, admin.ModelAdmin):
     pass
 
 
+@admin.register(Snapshot)
+class SnapshotAdmin(admin.ModelAdmin):
+    list_display = ('decision', 'etag', 'created')
+    readonly_fields = ('decision', 'data', 'etag', 'created')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Option)
-class OptionAdmin(admin.ModelAdmin):
-    pass
+class OptionAdmin(DiscardSnapshotMixin, admin.ModelAdmin):
+    """Options with votes keep their decision, the ballots of cast_vote count their votes."""
+    decision_path = 'decision'
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None and obj.tally:
+            return ('decision',)
+        return ()
+
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and not (obj is not None and obj.tally)
+
+
+@admin.register(OptionTemplate)
+class OptionTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'options')
 
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
-    pass
+    """Votes are only cast by Decision.cast_vote, which keeps the tallies and ballots in step."""
+    list_display = ('option', 'user', 'created')
+    readonly_fields = ('user', 'option', 'created')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Team)
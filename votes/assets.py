@@ -0,0 +1,37 @@
+"""Helpers for the commands which build static assets from the sources of the project."""
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+
+# third party files, whose words would keep most of the stylesheet and the icons alive
+VENDORED = ('bulma', 'fontawesome', 'luxon')
+
+
+def is_inside(path, directory):
+    # Path.is_relative_to needs Python 3.9
+    try:
+        Path(path).resolve().relative_to(Path(directory).resolve())
+    except ValueError:
+        return False
+    return True
+
+
+def source_files(exclude=()):
+    """Yield templates, scripts and Python modules of the project, which may mention CSS classes and icons."""
+    exclude = {Path(path).resolve() for path in exclude}
+    roots = {Path(directory) for template in settings.TEMPLATES for directory in template['DIRS']}
+    roots |= {Path(directory) for directory in settings.STATICFILES_DIRS}
+    roots |= {
+        Path(config.path) for config in apps.get_app_configs()
+        if is_inside(config.path, settings.BASE_DIR)
+    }
+
+    for root in roots:
+        for path in root.rglob('*'):
+            if path.suffix not in ('.html', '.js', '.py') or 'migrations' in path.parts:
+                continue
+            if path.name.startswith('test') or path.resolve() in exclude:
+                continue
+            if not any(name in path.name for name in VENDORED):
+                yield path
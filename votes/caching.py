@@ -0,0 +1,92 @@
+"""Versioned cache keys per model, shared by all processes using the same cache.
+
+Every namespace has a version number in the cache, which the signals in
+``votes.signals`` bump whenever a model of the namespace changes. Keys of cached
+values contain the versions of all namespaces the value was computed from, so a bump
+makes them unreachable for every process at once, without knowing the keys.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# pages holds the full pages of faking.pagecache, which may show any of the others
+NAMESPACES = ['decisions', 'votes', 'memberships', 'teams', 'invitations', 'users', 'pages']
+
+# namespaces bumped by the open transaction of this thread, and those not read since
+_local = threading.local()
+
+
+def version_key(namespace):
+    return f'votes:{namespace}:version'
+
+
+def initial_version():
+    # a version key evicted by the cache must not restart at a number used before
+    return time.time_ns() // 1000
+
+
+def get_versions(namespaces):
+    keys = [version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = initial_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def make_key(namespaces, *parts):
+    """Return a cache key for a value computed from the given namespaces, e.g.
+    ``make_key(['memberships', 'users'], 'roster', user.pk)``.
+
+    Values computed from tallies or the status of decisions depend on ``votes`` too,
+    because casting a vote updates both without saving the decision.
+    """
+    versions = get_versions(namespaces)
+    if hasattr(_local, 'unread'):
+        _local.unread.difference_update(namespaces)
+    return ':'.join([
+        'votes',
+        *(f'{namespace}.{version}' for namespace, version in zip(namespaces, versions)),
+        *(str(part) for part in parts),
+    ])
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            cache.set(version_key(namespace), initial_version(), None)
+
+
+def _flush():
+    namespaces, _local.pending, _local.unread = _local.pending, set(), set()
+    _bump(namespaces)
+
+
+def bump(*namespaces):
+    """Invalidate all values computed from the namespaces, now and after the transaction commits.
+
+    The second bump discards values which concurrent requests cached from the old rows
+    before the commit. Within a transaction a namespace is bumped again only if a key was
+    made from it in between, and once on commit, so a cascade deleting many rows costs a
+    bump per namespace instead of two per row.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # the change is committed already
+        _bump(namespaces)
+        return
+
+    if not any(func is _flush for _, func in connection.run_on_commit):
+        # first bump of the transaction, or the previous one was rolled back
+        _local.pending, _local.unread = set(), set()
+        transaction.on_commit(_flush)
+    _bump([namespace for namespace in namespaces if namespace not in _local.unread])
+    _local.pending.update(namespaces)
+    _local.unread.update(namespaces)
@@ -1,27 +1,37 @@
+import csv
+import io
+import json
+
 from datetime import timedelta
 from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
-from django.core.mail import send_mail
+from django.db.models import prefetch_related_objects
 from django.shortcuts import reverse
 from django.utils import timezone
 
-from .models import Decision, Option, Vote, Invitation, Team
+from outbox.models import Message
+
+from .models import Decision, Option, Invitation, Team
+from .roster import get_roster
 
 
 class DecisionForm(forms.ModelForm):
+    # choices come from the cached roster, submitted ids are validated against it without a query
+    voters = forms.TypedMultipleChoiceField(
+        coerce=int,
+        label="Stimmberechtigt",
+        widget=forms.SelectMultiple(attrs={
+            'size': 6,
+        }),
+    )
+
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user')
         super().__init__(*args, **kwargs)
-        self.fields['voters'].required = True
-        self.fields['voters'].queryset = User.objects.filter(
-            teams__in=self.user.teams.all(),
-        ).distinct().order_by('first_name', 'last_name')
-        self.fields['voters'].label_from_instance = self.label_from_instance
-
-    @staticmethod
-    def label_from_instance(obj):
-        return obj.get_full_name()
+        self.fields['voters'].choices = get_roster(self.user)
+        self.fields['template'].required = True
+        self.fields['template'].empty_label = None
 
     def clean_start(self):
         data = self.cleaned_data['start']
@@ -55,10 +65,10 @@ class DecisionForm(forms.ModelForm):
 
     class Meta:
         model = Decision
-        fields = ['subject', 'voters', 'start', 'end']
+        fields = ['subject', 'template', 'voters', 'start', 'end']
         labels = {
             'subject': "Gegenstand",
-            'voters': "Stimmberechtigt",
+            'template': "Optionen",
             'start': "Beginn",
             'end': "Ende",
         }
@@ -68,9 +78,6 @@ class DecisionForm(forms.ModelForm):
                 'placeholder': "Es sind maximal 255 Zeichen erlaubt.",
                 'rows': 2,
             }),
-            'voters': forms.SelectMultiple(attrs={
-                'size': 6,
-            }),
             'start': forms.DateTimeInput(attrs={
                 'class': "input",
                 'placeholder': "31.12.2099 16:30",
@@ -82,21 +89,95 @@ class DecisionForm(forms.ModelForm):
         }
 
 
-class VoteForm(forms.ModelForm):
+def parse_agenda(name, content):
+    """Read the subjects of an agenda from a JSON list or the first column of a CSV file."""
+    if name.lower().endswith('.json'):
+        items = json.loads(content)
+        if not isinstance(items, list):
+            raise ValueError("Expected a list of subjects.")
+        subjects = [item['subject'] if isinstance(item, dict) else item for item in items]
+        for number, subject in enumerate(subjects, start=1):
+            # str() would turn null into "None"
+            if not isinstance(subject, str):
+                raise ValidationError(f"Gegenstand {number} ist kein Text.", code='invalid')
+        return [subject.strip() for subject in subjects]
+
+    rows = csv.reader(io.StringIO(content))
+    subjects = [row[0].strip() for row in rows if row and row[0].strip()]
+    if subjects and subjects[0].lower() in ('subject', 'gegenstand'):
+        # skip the header
+        subjects = subjects[1:]
+    return subjects
+
+
+class AgendaImportForm(DecisionForm):
+    subjects = forms.CharField(
+        label="Gegenstände",
+        required=False,
+        help_text="Ein Gegenstand pro Zeile.",
+        widget=forms.Textarea(attrs={
+            'class': "textarea has-fixed-size",
+            'rows': 8,
+        }),
+    )
+    agenda = forms.FileField(
+        label="Tagesordnung (CSV oder JSON)",
+        required=False,
+    )
+
+    max_subjects = 100
+
+    def clean_agenda(self):
+        data = self.cleaned_data['agenda']
+        if not data:
+            return []
+
+        try:
+            return parse_agenda(data.name, data.read().decode('utf-8'))
+        except (ValueError, KeyError, TypeError, csv.Error):
+            raise ValidationError("Die Datei konnte nicht gelesen werden.", code='invalid')
+
+    def clean(self):
+        super().clean()
+        lines = self.cleaned_data.get('subjects', "").splitlines()
+        subjects = [line.strip() for line in lines if line.strip()] + self.cleaned_data.get('agenda', [])
+
+        if not subjects:
+            raise ValidationError("Es wurde kein Gegenstand angegeben.", code='required')
+
+        if len(subjects) > self.max_subjects:
+            raise ValidationError(f"Es können höchstens {self.max_subjects} Gegenstände importiert werden.",
+                                  code='invalid')
+
+        # same rules as the subject of a single decision
+        field = Decision._meta.get_field('subject')
+        for number, subject in enumerate(subjects, start=1):
+            try:
+                field.clean(subject, None)
+            except ValidationError as error:
+                self.add_error(None, ValidationError(f"Gegenstand {number}: {' '.join(error.messages)}",
+                                                     code='invalid'))
+
+        self.cleaned_data['subject_list'] = subjects
+        return self.cleaned_data
+
+    class Meta(DecisionForm.Meta):
+        fields = ['template', 'voters', 'start', 'end']
+
+
+class VoteForm(forms.Form):
+    option = forms.ModelChoiceField(
+        queryset=Option.objects.none(),
+        widget=forms.RadioSelect(attrs={
+            'class': "radio",
+        }),
+    )
+
     def __init__(self, *args, **kwargs):
         self.decision = kwargs.pop('decision')
         super().__init__(*args, **kwargs)
         self.fields['option'].queryset = Option.objects.filter(decision=self.decision)
 
-    class Meta:
-        model = Vote
-        fields = ['option']
-        widgets = {
-            'option': forms.RadioSelect(attrs={
-                'class': "radio",
-            }),
-        }
-
 
 class InvitationForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
@@ -142,13 +223,15 @@ class JoinTeamForm(forms.Form):
         data = self.cleaned_data['token']
 
         try:
-            invitation = Invitation.objects.get(token=data)
+            invitation = Invitation.objects.for_token(data)
         except ObjectDoesNotExist:
             raise ValidationError("Der Token ist ungültig.", code='invalid')
 
         if timezone.now() > invitation.expiry:
             raise ValidationError("Der Token ist abgelaufen.", code='invalid')
 
+        prefetch_related_objects([invitation], 'teams')
+        self.invitation = invitation
         return data
 
 
@@ -168,13 +251,15 @@ class RegistrationForm(forms.ModelForm):
             raise ValidationError("Die Registrierung ist nur mit einer Einladung möglich!", code='unauthorized')
 
         try:
-            invitation = Invitation.objects.get(token=data)
+            invitation = Invitation.objects.for_token(data)
         except ObjectDoesNotExist:
             raise ValidationError("Die verwendete Einladung ist ungültig.", code='invalid')
 
         if timezone.now() > invitation.expiry:
             raise ValidationError("Der verwendete Einladung ist abgelaufen.", code='expired')
 
+        prefetch_related_objects([invitation], 'teams')
+        self.invitation = invitation
         return data
 
     def clean_first_name(self):
@@ -199,8 +284,8 @@ class RegistrationForm(forms.ModelForm):
         return data
 
     def send_email(self, request, secret):
-        link = f"{request.scheme}://{request.get_host()}{reverse('password_change')}"
-        send_mail(
+        link = f"{request.scheme}://{request.get_host()}{reverse('admin:password_change')}"
+        Message.objects.enqueue(
             "Neuer Account erstellt",
             f"Hallo {self.cleaned_data['first_name']},\n\ndu kannst dich nun mit dem Benutzer "
             f"'{self.cleaned_data['username']}' und dem temporären Passwort '{secret}' "
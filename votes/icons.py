@@ -0,0 +1,93 @@
+"""Font Awesome icons as an inline SVG sprite.
+
+Only the icons referenced as ``fas fa-<name>`` (or ``far``/``fab``) in templates and
+Python sources end up in the sprite. Pages render them with ``<use>`` references, so
+no icon JavaScript runs in the browser.
+"""
+import logging
+import re
+
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.utils.html import format_html, format_html_join, mark_safe
+
+from .assets import source_files
+
+logger = logging.getLogger(__name__)
+
+SOURCE = 'faking/js/fontawesome.js'
+
+USAGE = re.compile(r'\b(fa[srb])\s+fa-([a-z0-9-]+)')
+DEFINITIONS = re.compile(r'var icons = \{(.*?)\n  \};.*?defineIcons\(\'(fa[srb])\', icons\)', re.S)
+DEFINITION = re.compile(r'"([a-z0-9-]+)": \[(\d+), (\d+), \[[^\]]*\], "[0-9a-f]+", "([^"]+)"\]')
+VIEW_BOX = re.compile(r'<symbol id="([a-z0-9-]+)" viewBox="([\d ]+)"')
+
+# the part of the Font Awesome styles which applies to the rendered icons
+STYLES = (
+    '.svg-inline--fa{display:inline-block;font-size:inherit;height:1em;overflow:visible;vertical-align:-.125em}'
+    '.fa-xs{font-size:.75em}.fa-sm{font-size:.875em}.fa-lg{font-size:1.3333333333em;vertical-align:-.225em}'
+    '.svg-inline--fa.fa-fw{width:1.25em}'
+)
+
+
+def load_definitions(path=None):
+    """Return the width, height and path of every icon per style prefix."""
+    path = path or finders.find(SOURCE)
+    with open(path, encoding='utf-8') as file:
+        source = file.read()
+    return {
+        prefix: {name: (int(width), int(height), d) for name, width, height, d in DEFINITION.findall(block)}
+        for block, prefix in DEFINITIONS.findall(source)
+    }
+
+
+def used_icons(paths):
+    """Collect the (prefix, name) pairs referenced in the given files."""
+    icons = set()
+    for path in paths:
+        icons.update(USAGE.findall(path.read_text(encoding='utf-8')))
+    return icons
+
+
+def render_sprite(icons, definitions):
+    """Render the styles and a hidden SVG with one symbol per known icon."""
+    symbols = sorted(
+        (f'{prefix}-{name}', *definitions[prefix][name])
+        for prefix, name in icons
+        if name in definitions.get(prefix, {})
+    )
+    return format_html(
+        '<style>{}</style><svg xmlns="http://www.w3.org/2000/svg" style="display: none">{}</svg>',
+        mark_safe(STYLES),
+        format_html_join(
+            '',
+            '<symbol id="{}" viewBox="0 0 {} {}"><path fill="currentColor" d="{}"/></symbol>',
+            symbols,
+        ),
+    )
+
+
+def build_sprite():
+    return render_sprite(used_icons(source_files()), load_definitions())
+
+
+@lru_cache(maxsize=None)
+def get_sprite():
+    """Return the sprite written by the build_icons command.
+
+    Without the file the sprite is built from the sources, once per process, which
+    reads every template and module of the project on the first rendered page.
+    """
+    path = Path(settings.ICON_SPRITE)
+    if path.exists():
+        return mark_safe(path.read_text(encoding='utf-8'))
+    logger.warning("%s does not exist, building the icon sprite from the sources. Run build_icons.", path)
+    return build_sprite()
+
+
+@lru_cache(maxsize=None)
+def get_view_boxes():
+    return dict(VIEW_BOX.findall(get_sprite()))
@@ -0,0 +1,215 @@
+"""Push the participation of a decision to its watchers with server-sent events.
+
+Watchers subscribe to an in-process broker. After a vote has been committed the
+progress is computed once and fanned out to every subscriber, so the cost of a
+change does not grow with the number of open pages. The endpoint is a plain ASGI
+application because Django 3.1 cannot stream responses from async views.
+"""
+import asyncio
+import json
+import threading
+
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib import auth
+from django.http.cookie import parse_cookie
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from .models import Decision
+from .pool import in_pool
+
+KEEPALIVE = 15
+
+
+class Broker:
+    """Deliver events to asyncio queues, which may be served by other threads' event loops."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, decision_id):
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(decision_id, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, decision_id, queue):
+        with self._lock:
+            queues = self._subscribers.get(decision_id, {})
+            queues.pop(queue, None)
+            if not queues:
+                self._subscribers.pop(decision_id, None)
+
+    def has_subscribers(self, decision_id):
+        return decision_id in self._subscribers
+
+    def publish(self, decision_id, event):
+        with self._lock:
+            targets = list(self._subscribers.get(decision_id, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # the loop of a disconnected watcher has already been closed
+                pass
+
+
+broker = Broker()
+
+
+def get_progress(decision_id):
+    decision = Decision.objects.with_participation().only(
+        'start', 'end', 'status',
+    ).filter(pk=decision_id).first()
+    if decision is None:
+        return None
+
+    return {
+        'voted': decision.voted_count,
+        'voters': decision.voter_count,
+        'state': decision.current_status(),
+        'start': decision.start,
+        'end': decision.end,
+    }
+
+
+def notify(decision_id):
+    """Send the current progress of a decision to its watchers, if there are any."""
+    if not broker.has_subscribers(decision_id):
+        return
+
+    progress = get_progress(decision_id)
+    if progress is not None:
+        broker.publish(decision_id, progress)
+
+
+def get_user(scope):
+    headers = dict(scope.get('headers', []))
+    cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+    return auth.get_user(SimpleNamespace(session=session))
+
+
+def current_state(progress):
+    """Derive the state at the time boundaries without asking the database."""
+    if progress['state'] == Decision.CLOSED:
+        return Decision.CLOSED
+
+    now = timezone.now()
+    if now < progress['start']:
+        return Decision.PENDING
+    if now < progress['end']:
+        return Decision.OPEN
+    return Decision.CLOSED
+
+
+def encode(progress):
+    data = json.dumps({
+        'voted': progress['voted'],
+        'voters': progress['voters'],
+        'state': progress['state'],
+    })
+    return f"data: {data}\n\n".encode()
+
+
+async def respond(send, status, body=b''):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def stream(scope, receive, send, decision_id):
+    user = await in_pool(get_user)(scope)
+    if not user.is_authenticated:
+        await respond(send, 403)
+        return
+
+    # subscribe before reading the progress, so no vote can slip in between
+    queue = broker.subscribe(decision_id)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        progress = await in_pool(get_progress)(decision_id)
+        if progress is None:
+            await respond(send, 404)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': encode(progress), 'more_body': True})
+
+        while progress['state'] != Decision.CLOSED:
+            now = timezone.now()
+            boundary = progress['start'] if now < progress['start'] else progress['end']
+            timeout = min(KEEPALIVE, max((boundary - now).total_seconds(), 0))
+
+            update = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({update, disconnect}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                update.cancel()
+                return
+
+            if update in done:
+                progress = update.result()
+                while not queue.empty():
+                    # only the latest progress is of interest
+                    progress = queue.get_nowait()
+            else:
+                update.cancel()
+                state = current_state(progress)
+                if state == progress['state']:
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                    continue
+                progress = dict(progress, state=state)
+
+            await send({'type': 'http.response.body', 'body': encode(progress), 'more_body': True})
+
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(decision_id, queue)
+
+
+class LiveProgressRouter:
+    """Serve the live progress endpoint and hand every other request to Django."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            try:
+                match = resolve(path)
+            except Resolver404:
+                pass
+            else:
+                if match.view_name == 'votes:live':
+                    await stream(scope, receive, send, match.kwargs['pk'])
+                    return
+
+        await self.application(scope, receive, send)
@@ -0,0 +1,153 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLResolver, get_resolver, reverse
+
+from votes.models import Decision, Invitation
+from votes.seeding import seed
+
+NAMESPACES = ['mentoring', 'votes']
+
+# routes which need a closed decision, all others get an open one
+CLOSED_ROUTES = {'votes:result', 'votes:result-export'}
+
+
+def get_routes():
+    for resolver in get_resolver().url_patterns:
+        if isinstance(resolver, URLResolver) and resolver.namespace in NAMESPACES:
+            for pattern in resolver.url_patterns:
+                yield f"{resolver.namespace}:{pattern.name}", list(pattern.pattern.converters)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+
+def measure(client, url, repeat):
+    client.get(url)  # warm up caches and lazy imports
+
+    durations, queries = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            durations.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(durations), 2),
+        'p95_ms': round(percentile(durations, 95), 2),
+        'queries': max(queries),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return the routes which got slower than the baseline allows or run more queries."""
+    regressions = []
+    for name, before in baseline['routes'].items():
+        after = results['routes'].get(name)
+        if after is None:
+            continue
+        if after['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']} -> {after['queries']} queries")
+        if after['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {after['p95_ms']} ms")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = "Seed a dataset and measure latency and queries of every votes and mentoring route."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help="Size of the dataset, 1 is the full size.")
+        parser.add_argument('--repeat', type=int, default=20, help="Requests per route.")
+        parser.add_argument('--output', default='benchmark.json', help="Where to write the results.")
+        parser.add_argument('--baseline', help="Results of an earlier run to compare with.")
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help="Allowed relative increase of the p95 latency over the baseline.",
+        )
+        parser.add_argument(
+            '--reuse-db',
+            action='store_true',
+            help="Use the configured database instead of a throwaway test database, seed it only if empty.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        try:
+            setup_test_environment()
+            teardown = teardown_test_environment
+        except RuntimeError:
+            # already set up by the test runner
+            teardown = None
+
+        old_name = None
+        if not options['reuse_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = self.run(options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            if teardown is not None:
+                teardown()
+
+        with open(options['output'], 'w') as file:
+            json.dump(results, file, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def run(self, options):
+        if not Decision.objects.exists():
+            start = time.perf_counter()
+            counts = seed(scale=options['scale'])
+            self.stdout.write(f"Seeded {counts} in {time.perf_counter() - start:.1f} s")
+
+        # a voter with open and closed decisions, who also created invitations
+        user = User.objects.get(pk=Invitation.objects.order_by('pk').values_list('creator', flat=True)[0])
+        client = Client()
+        client.force_login(user)
+        decisions = {
+            status: Decision.objects.filter(voters=user, status=status).order_by('pk').values_list('pk', flat=True)[0]
+            for status in [Decision.OPEN, Decision.CLOSED]
+        }
+
+        routes = {}
+        for name, params in get_routes():
+            status = Decision.CLOSED if name in CLOSED_ROUTES else Decision.OPEN
+            url = reverse(name, kwargs={'pk': decisions[status]} if params else None)
+            routes[name] = measure(client, url, options['repeat'])
+            self.stdout.write(
+                f"{name:28} {routes[name]['status']}  p50 {routes[name]['p50_ms']:8.2f} ms  "
+                f"p95 {routes[name]['p95_ms']:8.2f} ms  {routes[name]['queries']:3} queries"
+            )
+
+        return {
+            'scale': options['scale'],
+            'repeat': options['repeat'],
+            'database': settings.DATABASES['default']['ENGINE'],
+            'routes': routes,
+        }
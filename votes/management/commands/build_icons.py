@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from votes.icons import build_sprite
+
+
+class Command(BaseCommand):
+    help = "Build the SVG sprite with the Font Awesome icons used in templates and Python sources."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.ICON_SPRITE, help="Where to write the sprite.")
+
+    def handle(self, *args, **options):
+        sprite = build_sprite()
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(sprite, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output} with {sprite.count('<symbol')} icons, {len(sprite)} bytes."
+        ))
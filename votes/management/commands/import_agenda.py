@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+
+from votes.forms import AgendaImportForm
+from votes.models import Decision, OptionTemplate
+from votes.roster import get_roster
+
+
+class Command(BaseCommand):
+    help = "Create one decision per subject of a CSV or JSON agenda."
+
+    def add_arguments(self, parser):
+        parser.add_argument('agenda', help="CSV file (first column) or JSON list of subjects.")
+        parser.add_argument('--author', required=True, help="Username of the author.")
+        parser.add_argument('--start', required=True, help="Start of the voting, e.g. '2099-12-31 16:30'.")
+        parser.add_argument('--end', required=True, help="End of the voting, e.g. '2099-12-31 17:30'.")
+        parser.add_argument(
+            '--voters',
+            nargs='+',
+            metavar='USERNAME',
+            help="Usernames of the voters (default: all members of the author's teams).",
+        )
+        parser.add_argument(
+            '--template',
+            type=int,
+            help="Primary key of the option template (default: the first one).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown author '{options['author']}'.")
+
+        if options['voters']:
+            voters = list(User.objects.filter(username__in=options['voters']).values_list('pk', flat=True))
+        else:
+            voters = [pk for pk, _ in get_roster(author)]
+
+        template = options['template'] or OptionTemplate.objects.values_list('pk', flat=True).first()
+
+        path = Path(options['agenda'])
+        form = AgendaImportForm(
+            data={
+                'template': template,
+                'voters': voters,
+                'start': options['start'],
+                'end': options['end'],
+            },
+            files={
+                'agenda': SimpleUploadedFile(path.name, path.read_bytes()),
+            },
+            user=author,
+        )
+        if not form.is_valid():
+            errors = [f"{field}: {' '.join(messages)}" for field, messages in form.errors.items()]
+            raise CommandError("\n".join(errors))
+
+        decisions = Decision.objects.bulk_import(
+            form.cleaned_data['subject_list'],
+            author=author,
+            template=form.cleaned_data['template'],
+            voter_ids=form.cleaned_data['voters'],
+            start=form.cleaned_data['start'],
+            end=form.cleaned_data['end'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(decisions)} decision(s)."))
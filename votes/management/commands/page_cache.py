@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from faking.pagecache import get_stats, reset_stats
+from votes import caching
+
+
+class Command(BaseCommand):
+    help = "Show the hits and misses of the pages cached for anonymous visitors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Invalidate all cached pages.")
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after showing them.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            caching.bump('pages')
+            self.stdout.write("Invalidated all cached pages.")
+            return
+
+        for name, stats in get_stats().items():
+            requests = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / requests if requests else 0
+            self.stdout.write(f"{name:28} {stats['hits']:8} hits {stats['misses']:8} misses {ratio:7.1%}")
+
+        if options['reset']:
+            reset_stats()
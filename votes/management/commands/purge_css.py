@@ -0,0 +1,124 @@
+import re
+
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from votes.assets import is_inside, source_files
+
+STYLESHEET = 'faking/css/bulma.min.css'
+
+WORD = re.compile(r'[a-z][a-z0-9-]*')
+DYNAMIC_PREFIX = re.compile(r'([a-z][a-z0-9-]*-){{')
+CLASS = re.compile(r'\.(-?[_a-zA-Z][_a-zA-Z0-9-]*)')
+NEGATION = re.compile(r':not\([^)]*\)')
+
+
+def used_classes(paths):
+    """Collect every word which could be a class, including ``prefix-{{ variable }}`` combinations."""
+    words, prefixes = set(), set()
+    for path in paths:
+        text = path.read_text(encoding='utf-8')
+        words.update(WORD.findall(text))
+        prefixes.update(DYNAMIC_PREFIX.findall(text))
+    return words | {prefix + word for prefix in prefixes for word in words}
+
+
+def split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return [selector.strip() for selector in selectors]
+
+
+def closing_brace(css, start):
+    depth = 0
+    for index in range(start, len(css)):
+        if css[index] == '{':
+            depth += 1
+        elif css[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("Unbalanced braces")
+
+
+def purge(css, used):
+    """Drop the selectors of a minified stylesheet which require a class that is never used."""
+    result = []
+    position = 0
+    while True:
+        brace = css.find('{', position)
+        if brace == -1:
+            result.append(css[position:].strip())
+            return ''.join(result)
+
+        prelude = css[position:brace]
+        if ';' in prelude:
+            # statements like @charset before the rule
+            statements, prelude = prelude.rsplit(';', 1)
+            result.append(statements + ';')
+        prelude = prelude.strip()
+        end = closing_brace(css, brace)
+        body = css[brace + 1:end]
+
+        if prelude.startswith(('@media', '@supports')):
+            inner = purge(body, used)
+            if inner:
+                result.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            # keyframes and font faces
+            result.append(f"{prelude}{{{body}}}")
+        else:
+            selectors = [
+                selector for selector in split_selectors(prelude)
+                if set(CLASS.findall(NEGATION.sub('', selector))) <= used
+            ]
+            if selectors:
+                result.append(f"{','.join(selectors)}{{{body}}}")
+
+        position = end + 1
+
+
+class Command(BaseCommand):
+    help = "Build a copy of Bulma which only contains the rules for classes used by the project."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.STATIC_BUILD_DIR,
+            help="Static directory for the purged stylesheet, which has to precede the sources in "
+                 "STATICFILES_DIRS.",
+        )
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        source = None
+        for path in finders.find(STYLESHEET, all=True):
+            if not is_inside(path, output):
+                source = Path(path)
+                break
+        if source is None:
+            raise CommandError(f"{STYLESHEET} not found.")
+
+        css = source.read_text(encoding='utf-8')
+        banner = re.match(r'/\*!.*?\*/', css)
+        purged = purge(re.sub(r'/\*.*?\*/', '', css, flags=re.S), used_classes(source_files(exclude=[__file__])))
+        if banner:
+            purged = banner.group(0) + purged
+
+        target = output / STYLESHEET
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(purged, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {target} with {len(purged) // 1024} KB instead of {len(css) // 1024} KB."
+        ))
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from votes.models import Invitation
+
+
+class Command(BaseCommand):
+    help = "Delete expired invitations in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=0,
+            help="Only delete invitations which expired at least this many days ago (default: 0).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of invitations deleted per transaction (default: 500).",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help="Seconds to wait between two batches (default: 0).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        deleted = 0
+
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Invitation.objects.filter(expiry__lt=cutoff).order_by('pk').values_list('pk', flat=True)[
+                        :options['batch_size']
+                    ]
+                )
+                if not batch:
+                    break
+
+                # the collector sets Membership.invitation to NULL and removes the team relations
+                Invitation.objects.filter(pk__in=batch).delete()
+                deleted += len(batch)
+
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired invitation(s)."))
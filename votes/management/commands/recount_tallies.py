@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from votes import caching
+from votes.models import Decision, Option, Vote
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized vote tallies and verify them against the recorded votes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report mismatching counters and exit with an error if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        tally = Vote.objects.filter(
+            option=OuterRef('pk'),
+        ).order_by().values('option').annotate(count=Count('pk')).values('count')
+        ballots = Vote.objects.filter(
+            option__decision=OuterRef('pk'),
+        ).order_by().values('option__decision').annotate(count=Count('pk')).values('count')
+
+        with transaction.atomic():
+            stale_options = Option.objects.select_for_update().annotate(
+                expected=Coalesce(Subquery(tally), 0),
+            ).exclude(tally=F('expected'))
+            stale_decisions = Decision.objects.select_for_update().annotate(
+                expected=Coalesce(Subquery(ballots), 0),
+            ).exclude(ballots=F('expected'))
+
+            options_count = len(stale_options)
+            decisions_count = len(stale_decisions)
+
+            for option in stale_options:
+                self.stdout.write(f"Option {option.pk}: {option.tally} stored, {option.expected} counted")
+            for decision in stale_decisions:
+                self.stdout.write(f"Decision {decision.pk}: {decision.ballots} stored, {decision.expected} counted")
+
+            if options['check']:
+                if options_count or decisions_count:
+                    raise CommandError(f"{options_count} option(s) and {decisions_count} decision(s) out of sync.")
+                self.stdout.write(self.style.SUCCESS("All tallies are in sync."))
+                return
+
+            Option.objects.filter(pk__in=[o.pk for o in stale_options]).update(
+                tally=Coalesce(Subquery(tally), 0),
+            )
+            Decision.objects.filter(pk__in=[d.pk for d in stale_decisions]).update(
+                ballots=Coalesce(Subquery(ballots), 0),
+            )
+            caching.bump('decisions')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recounted {options_count} option(s) and {decisions_count} decision(s)."
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from votes.models import Decision
+
+
+class Command(BaseCommand):
+    help = "Open and close decisions whose start or end has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep running and advance the decisions periodically.",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=15,
+            help="Seconds to wait between two runs in loop mode (default: 15).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            opened, closed = Decision.objects.advance()
+            frozen = Decision.objects.freeze_closed()
+            if opened or closed or frozen or options['verbosity'] > 1:
+                self.stdout.write(f"Opened {opened}, closed {closed} and froze {frozen} decision(s).")
+
+            if not options['loop']:
+                break
+
+            time.sleep(options['interval'])
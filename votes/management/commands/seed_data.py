@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from votes.seeding import seed
+
+
+class Command(BaseCommand):
+    help = "Add a generated dataset of teams, users, decisions and votes to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help="Size of the dataset, 1 is 50 teams, 2,000 users, 5,000 decisions and about 200,000 votes.",
+        )
+        parser.add_argument('--teams', type=int, help="Number of teams, overrides the scale.")
+        parser.add_argument('--users', type=int, help="Number of users, overrides the scale.")
+        parser.add_argument('--decisions', type=int, help="Number of decisions, overrides the scale.")
+        parser.add_argument('--votes', type=int, help="Targeted number of votes, overrides the scale.")
+        parser.add_argument('--mentors', type=int, help="Number of mentors, overrides the scale.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator.")
+        parser.add_argument('--password', help="Password of all users (default: unusable).")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = seed(
+            scale=options['scale'],
+            seed=options['seed'],
+            password=options['password'],
+            teams=options['teams'],
+            users=options['users'],
+            decisions=options['decisions'],
+            votes=options['votes'],
+            mentors=options['mentors'],
+        )
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {time.perf_counter() - start:.1f} s."))
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.management.commands import collectstatic
+from django.core.files.base import ContentFile
+
+STATE = 'staticfiles.sources.json'
+
+
+class Command(collectstatic.Command):
+    help = (
+        "Collect only the static files whose content changed since the last run, "
+        "or nothing at all if the sources match the collected ones."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--sources',
+            help="Content hashes of the sources written by --bake, instead of hashing the sources now.",
+        )
+        parser.add_argument(
+            '--bake',
+            metavar='PATH',
+            help="Only write the content hashes of the sources to PATH, for example when building an image.",
+        )
+
+    def hash_sources(self):
+        """Return the SHA-256 of every file collectstatic would copy, by prefixed path."""
+        sources = {}
+        for finder in get_finders():
+            for path, storage in finder.list(self.ignore_patterns):
+                prefixed_path = os.path.join(storage.prefix, path) if getattr(storage, 'prefix', None) else path
+                # the first finder wins, as in collectstatic
+                if prefixed_path not in sources:
+                    with storage.open(path) as file:
+                        sources[prefixed_path] = hashlib.sha256(file.read()).hexdigest()
+        return sources
+
+    def load_state(self):
+        if not self.storage.exists(STATE):
+            return {}
+        with self.storage.open(STATE) as file:
+            return json.load(file)
+
+    def handle(self, **options):
+        self.set_options(**options)
+
+        if options['bake']:
+            with open(options['bake'], 'w') as file:
+                json.dump(self.hash_sources(), file, indent=0, sort_keys=True)
+            return
+
+        if options['sources']:
+            with open(options['sources']) as file:
+                self.sources = json.load(file)
+        else:
+            self.sources = self.hash_sources()
+        self.previous = {} if self.clear else self.load_state()
+
+        if self.sources == self.previous:
+            if self.verbosity >= 1:
+                self.stdout.write("All static files are up to date.")
+            return
+
+        summary = super().handle(**options)
+
+        if not self.dry_run:
+            for removed in self.previous.keys() - self.sources.keys():
+                # hashed copies stay for pages rendered before the deployment, --clear removes them
+                if self.storage.exists(removed):
+                    self.log(f"Deleting '{removed}'", level=1)
+                    self.storage.delete(removed)
+            if self.storage.exists(STATE):
+                self.storage.delete(STATE)
+            self.storage.save(STATE, ContentFile(json.dumps(self.sources, indent=0, sort_keys=True).encode()))
+
+        return summary
+
+    def delete_file(self, path, prefixed_path, source_storage):
+        """Compare content hashes instead of modification times, which an image build does not preserve."""
+        if self.symlink or not self.storage.exists(prefixed_path):
+            return super().delete_file(path, prefixed_path, source_storage)
+
+        if prefixed_path in self.previous and self.previous[prefixed_path] == self.sources.get(prefixed_path):
+            if prefixed_path not in self.unmodified_files:
+                self.unmodified_files.append(prefixed_path)
+            self.log(f"Skipping '{path}' (not modified)")
+            return False
+
+        if self.dry_run:
+            self.log(f"Pretending to delete '{path}'")
+        else:
+            self.log(f"Deleting '{path}'")
+            self.storage.delete(prefixed_path)
+        return True
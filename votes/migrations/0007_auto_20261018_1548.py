@@ -0,0 +1,45 @@
+# Generated by Django 3.1.12 on 2026-10-18 13:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_votes(apps, schema_editor):
+    Decision = apps.get_model('votes', 'Decision')
+    Option = apps.get_model('votes', 'Option')
+    Vote = apps.get_model('votes', 'Vote')
+
+    tally = Vote.objects.filter(
+        option=OuterRef('pk'),
+    ).order_by().values('option').annotate(count=Count('pk')).values('count')
+    Option.objects.update(tally=Coalesce(Subquery(tally), 0))
+
+    ballots = Vote.objects.filter(
+        option__decision=OuterRef('pk'),
+    ).order_by().values('option__decision').annotate(count=Count('pk')).values('count')
+    Decision.objects.update(ballots=Coalesce(Subquery(ballots), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0006_membership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='decision',
+            name='ballots',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='option',
+            name='tally',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            code=count_existing_votes,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
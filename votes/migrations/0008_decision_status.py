@@ -0,0 +1,37 @@
+# Generated by Django 3.1.12 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+
+def set_initial_status(apps, schema_editor):
+    Decision = apps.get_model('votes', 'Decision')
+    Vote = apps.get_model('votes', 'Vote')
+
+    now = timezone.now()
+    Decision.objects.filter(start__lte=now, end__gt=now).update(status='open')
+    Decision.objects.filter(end__lte=now).update(status='closed')
+
+    has_voted = Vote.objects.filter(user=OuterRef('user'), option__decision=OuterRef('decision'))
+    pending = Decision.voters.through.objects.filter(decision=OuterRef('pk')).filter(~Exists(has_voted))
+    Decision.objects.filter(~Exists(pending)).update(status='closed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0007_auto_20261018_1548'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='decision',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('open', 'Offen'), ('closed', 'Geschlossen')], db_index=True, default='pending', editable=False, max_length=7),
+        ),
+        migrations.RunPython(
+            code=set_initial_status,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
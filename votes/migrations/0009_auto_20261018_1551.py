@@ -0,0 +1,25 @@
+# Generated by Django 3.1.12 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0008_decision_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='decision',
+            index=models.Index(fields=['start', 'id'], name='votes_decis_start_14ff73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='decision',
+            index=models.Index(fields=['end', 'id'], name='votes_decis_end_4a6012_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['created', 'id'], name='votes_invit_created_1009ac_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.12 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0010_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['token', 'expiry', 'id'], name='votes_invit_token_063812_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['expiry'], name='votes_invit_expiry_7b910e_idx'),
+        ),
+    ]
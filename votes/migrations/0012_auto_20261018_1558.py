@@ -0,0 +1,39 @@
+# Generated by Django 3.1.12 on 2026-10-18 13:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_default_template(apps, schema_editor):
+    OptionTemplate = apps.get_model('votes', 'OptionTemplate')
+    OptionTemplate.objects.create(name="Dafür / Dagegen / Enthaltung", options="Dafür\nDagegen\nEnthaltung")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0011_auto_20261018_1556'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptionTemplate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('options', models.TextField(help_text='Eine Option pro Zeile.')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='decision',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='decisions', to='votes.optiontemplate'),
+        ),
+        migrations.RunPython(
+            code=create_default_template,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.12 on 2026-10-18 15:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votes', '0012_auto_20261018_1558'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='invitation',
+            name='votes_invit_token_063812_idx',
+        ),
+    ]
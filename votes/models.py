@@ -1,76 +1,360 @@
-from django.db import models
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching
+
+
+def get_visible_user_ids(user: User):
+    """Return the ids of all users sharing at least one team with the given user."""
+    return set(Membership.objects.filter(team__membership__user=user).values_list('user', flat=True))
+
+
+STATES = {
+    'pending': {
+        'code': "pending",
+        'color': "warning",
+        'icon': "fas fa-clock",
+    },
+    'open': {
+        'code': "open",
+        'color': "success",
+        'icon': "fas fa-vote-yea",
+    },
+    'closed': {
+        'code': "closed",
+        'color': "danger",
+        'icon': "fas fa-lock",
+    },
+}
+
+
+def pending_voters_subquery():
+    """Return the voters of the outer decision who have not voted yet."""
+    has_voted = Vote.objects.filter(user=OuterRef('user'), option__decision=OuterRef('decision'))
+    return Decision.voters.through.objects.filter(decision=OuterRef('pk')).filter(~Exists(has_voted))
+
+
+class DecisionQuerySet(models.QuerySet):
+    def with_participation(self):
+        """Annotate voter count and voted count in a single query."""
+        voter_count = Decision.voters.through.objects.filter(
+            decision=OuterRef('pk'),
+        ).order_by().values('decision').annotate(count=Count('user')).values('count')
 
+        voted_count = Vote.objects.filter(
+            option__decision=OuterRef('pk'),
+            user__elections=OuterRef('pk'),
+        ).order_by().values('option__decision').annotate(count=Count('user', distinct=True)).values('count')
+
+        return self.annotate(
+            voter_count=Coalesce(Subquery(voter_count), 0),
+            voted_count=Coalesce(Subquery(voted_count), 0),
+        )
+
+    def without_pending_voters(self):
+        return self.filter(~Exists(pending_voters_subquery()))
+
+    def with_vote_status(self, user):
+        """Annotate whether the user may vote and has voted, without extra queries per decision."""
+        return self.annotate(
+            entitled_to_vote=Exists(Decision.voters.through.objects.filter(decision=OuterRef('pk'), user=user.pk)),
+            user_has_voted=Exists(Vote.objects.filter(option__decision=OuterRef('pk'), user=user.pk)),
+        )
+
+    def advance(self, now=None):
+        """Move decisions across their start/end boundaries with bulk updates.
+
+        Returns the number of opened and closed decisions.
+        """
+        now = now or timezone.now()
+        running = self.exclude(status=Decision.CLOSED)
+
+        opened = running.filter(
+            status=Decision.PENDING,
+            start__lte=now,
+            end__gt=now,
+        ).update(status=Decision.OPEN)
+
+        closed = running.filter(end__lte=now).update(status=Decision.CLOSED)
+        # decisions where every voter has voted already are closed early
+        closed += running.without_pending_voters().update(status=Decision.CLOSED)
+
+        if opened or closed:
+            # bulk updates do not send the signals which invalidate cached values
+            caching.bump('decisions')
+        return opened, closed
+
+    def bulk_import(self, subjects, author, template, voter_ids, start, end):
+        """Create decisions sharing template, voters and time window with a fixed number of inserts."""
+        decisions = [
+            Decision(subject=subject, author=author, template=template, start=start, end=end)
+            for subject in subjects
+        ]
+        for decision in decisions:
+            decision.status = decision.current_status()
 
-def get_all_friends(self: User):
-    teams_pk = self.teams.values_list('pk', flat=True)
-    members_pk = Team.objects.filter(pk__in=teams_pk).values_list('members', flat=True).distinct()
-    return User.objects.filter(pk__in=members_pk)
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                decisions = self.bulk_create(decisions)
+            else:
+                # the primary keys are needed for the relations below
+                for decision in decisions:
+                    decision.save()
 
+            Decision.voters.through.objects.bulk_create([
+                Decision.voters.through(decision_id=decision.pk, user_id=voter_id)
+                for decision in decisions for voter_id in voter_ids
+            ])
+            Option.objects.bulk_create([
+                Option(decision=decision, text=text)
+                for decision in decisions for text in template.get_options()
+            ])
+            caching.bump('decisions')
 
-User.add_to_class("friends", get_all_friends)
+        return decisions
+
+    def freeze_closed(self):
+        """Write the snapshots of closed decisions which do not have one yet."""
+        decisions = list(self.filter(status=Decision.CLOSED, snapshot__isnull=True).select_related('author'))
+        for decision in decisions:
+            decision.freeze()
+        return len(decisions)
+
+
+class OptionTemplate(models.Model):
+    name = models.CharField(max_length=100)
+    options = models.TextField(help_text="Eine Option pro Zeile.")
+
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self):
+        return self.name
+
+    def get_options(self):
+        return [line.strip() for line in self.options.splitlines() if line.strip()]
+
+    def clean(self):
+        max_length = Option._meta.get_field('text').max_length
+        options = self.get_options()
+        if not options:
+            raise ValidationError({'options': "Es wird mindestens eine Option benötigt."})
+        if any(len(option) > max_length for option in options):
+            raise ValidationError({'options': f"Optionen dürfen höchstens {max_length} Zeichen lang sein."})
 
 
 class Decision(models.Model):
+    PENDING = 'pending'
+    OPEN = 'open'
+    CLOSED = 'closed'
+    STATUS_CHOICES = [
+        (PENDING, "Ausstehend"),
+        (OPEN, "Offen"),
+        (CLOSED, "Geschlossen"),
+    ]
+
     subject = models.CharField(max_length=255)
     author = models.ForeignKey(User, related_name='decisions', on_delete=models.SET_NULL, null=True)
     voters = models.ManyToManyField(User, related_name='elections', blank=True)
+    template = models.ForeignKey(OptionTemplate, related_name='decisions', on_delete=models.SET_NULL, null=True,
+                                 blank=True)
     start = models.DateTimeField()
     end = models.DateTimeField()
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=PENDING, db_index=True, editable=False)
+    ballots = models.PositiveIntegerField(default=0, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    objects = DecisionQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.subject}"
 
+    def save(self, *args, **kwargs):
+        # recomputed from the time window, so moving the end of a closed decision reopens it,
+        # unless it was closed early because every voter has voted
+        self.status = self.scheduled_status()
+        if self.status == self.OPEN and self.pk:
+            if Decision.objects.filter(pk=self.pk).without_pending_voters().exists():
+                self.status = self.CLOSED
+        super().save(*args, **kwargs)
+
+    def create_options(self, texts=None):
+        """Create the options in a single insert, copied from the template by default."""
+        if texts is None:
+            texts = self.template.get_options()
+        return Option.objects.bulk_create([Option(decision=self, text=text) for text in texts])
+
+    def build_result(self):
+        """Return the result from the counters maintained by cast_vote, without counting the votes."""
+        options = self.options.order_by('pk')
+        voters = self.voters.order_by('first_name', 'last_name')
+
+        return {
+            'subject': self.subject,
+            'author': self.author.get_full_name() if self.author else "",
+            'created': self.created,
+            'start': self.start,
+            'end': self.end,
+            'voters': [voter.get_full_name() for voter in voters],
+            'voted': self.ballots,
+            'options': [{'text': option.text, 'votes': option.tally} for option in options],
+        }
+
+    def freeze(self):
+        """Return the snapshot of the final result, writing it on first use."""
+        try:
+            return self.snapshot
+        except Snapshot.DoesNotExist:
+            pass
+
+        data = json.loads(json.dumps(self.build_result(), cls=DjangoJSONEncoder))
+        self.snapshot, _ = Snapshot.objects.get_or_create(
+            decision=self,
+            defaults={'data': data, 'etag': Snapshot.compute_etag(data)},
+        )
+        cache.set(Snapshot.validators_key(self.pk), (self.snapshot.etag, self.snapshot.created))
+        return self.snapshot
+
+    def discard_snapshot(self):
+        """Drop the snapshot so it is written again, e.g. after an admin edit."""
+        Snapshot.objects.filter(decision=self).delete()
+        cache.delete(Snapshot.validators_key(self.pk))
+
+    def _has_participation(self):
+        return hasattr(self, 'voter_count') and hasattr(self, 'voted_count')
+
     def pending_voters(self):
-        voters = []
-        for user in self.voters.all():
-            votes = Vote.objects.filter(user=user, option__in=self.options.all())
-            if not votes.count():
-                voters.append(user)
+        if self._has_participation() and self.voted_count >= self.voter_count:
+            return []
 
-        return voters
+        return list(self.voters.exclude(vote__option__decision=self))
 
-    def state(self):
-        now = timezone.now()
+    def has_voted(self, user):
+        return Vote.objects.filter(user=user, option__decision=self).exists()
+
+    def cast_vote(self, user, option):
+        """Record the vote of a user and update the tallies within a single transaction.
+
+        The eligibility row of the voter is locked, so concurrent requests of the same
+        user are serialized while votes of other users are not blocked.
+        """
+        if option.decision_id != self.pk:
+            raise PermissionDenied()
+
+        try:
+            with transaction.atomic():
+                eligible = Decision.voters.through.objects.select_for_update().filter(
+                    decision=self,
+                    user=user,
+                ).values_list('pk', flat=True)
+                if not eligible:
+                    # user not entitled to vote
+                    raise PermissionDenied()
+
+                if self.has_voted(user):
+                    # user already voted
+                    raise PermissionDenied()
+
+                vote = Vote.objects.create(user=user, option=option)
+                Option.objects.filter(pk=option.pk).update(tally=F('tally') + 1)
+                Decision.objects.filter(pk=self.pk).update(
+                    ballots=F('ballots') + 1,
+                    # close early once every voter has voted
+                    status=Case(
+                        When(~Exists(pending_voters_subquery()), then=Value(self.CLOSED)),
+                        default=F('status'),
+                    ),
+                )
+        except IntegrityError:
+            # guarded by the unique_vote constraint
+            raise PermissionDenied()
 
-        if not self.pending_voters():
-            # all voters have voted
-            return {
-                'code': "closed",
-                'color': "danger",
-                'icon': "fas fa-lock",
-            }
+        return vote
+
+    def current_status(self):
+        # the stored status may lag behind the scheduler, the time boundaries never do
+        if self.status == self.CLOSED:
+            # closed early or by the scheduler
+            return self.CLOSED
+        return self.scheduled_status()
+
+    def scheduled_status(self):
+        now = timezone.now()
 
         if now < self.start:
             # voting not started
-            return {
-                'code': "pending",
-                'color': "warning",
-                'icon': "fas fa-clock",
-            }
+            return self.PENDING
 
         if self.start <= now < self.end:
             # voting possible
-            return {
-                'code': "open",
-                'color': "success",
-                'icon': "fas fa-vote-yea",
-            }
+            return self.OPEN
 
         # voting closed
-        return {
-            'code': "closed",
-            'color': "danger",
-            'icon': "fas fa-lock",
-        }
+        return self.CLOSED
+
+    def state(self):
+        return dict(STATES[self.current_status()])
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start', 'id']),
+            models.Index(fields=['end', 'id']),
+        ]
+
+
+class Snapshot(models.Model):
+    decision = models.OneToOneField(Decision, related_name='snapshot', on_delete=models.CASCADE, primary_key=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    etag = models.CharField(max_length=64)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.decision_id}"
+
+    @property
+    def result(self):
+        result = dict(self.data)
+        for key in ['created', 'start', 'end']:
+            result[key] = parse_datetime(result[key])
+        return result
+
+    @staticmethod
+    def compute_etag(data):
+        content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    @staticmethod
+    def validators_key(decision_pk):
+        return f"votes:snapshot:{decision_pk}"
+
+    @classmethod
+    def get_validators(cls, decision_pk):
+        """Return the ETag and modification time of a snapshot, cached to answer revalidations cheaply."""
+        key = cls.validators_key(decision_pk)
+        validators = cache.get(key)
+        if validators is None:
+            validators = cls.objects.filter(decision=decision_pk).values_list('etag', 'created').first()
+            if validators is None:
+                return None, None
+            cache.set(key, validators)
+        return validators
 
 
 class Option(models.Model):
     decision = models.ForeignKey(Decision, related_name='options', on_delete=models.CASCADE)
     text = models.CharField(max_length=50)
+    tally = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.text}"
@@ -100,6 +384,25 @@ class Team(models.Model):
         return self.name
 
 
+class InvitationQuerySet(models.QuerySet):
+    def for_token(self, token):
+        """Fetch only the columns needed to validate a token, found by the unique index of the token."""
+        return self.only('expiry').get(token=token)
+
+    def visible_to(self, user):
+        """Invitations of which the user is a member of all teams."""
+        team_ids = list(user.teams.values_list('pk', flat=True))
+        if not team_ids:
+            return self.none()
+
+        teams = Invitation.teams.through.objects.filter(invitation=OuterRef('pk'))
+        return self.filter(
+            Exists(teams.filter(team__in=team_ids)),
+        ).exclude(
+            Exists(teams.exclude(team__in=team_ids)),
+        )
+
+
 class Invitation(models.Model):
     token = models.SlugField(unique=True)
     teams = models.ManyToManyField(Team, related_name='invitations')
@@ -107,6 +410,23 @@ class Invitation(models.Model):
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = InvitationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['expiry']),
+        ]
+
+    def accept(self, user):
+        """Add the user to all teams of the invitation, keeping existing memberships."""
+        Membership.objects.bulk_create(
+            [Membership(team=team, user=user, invitation=self) for team in self.teams.all()],
+            ignore_conflicts=True,
+        )
+        # bulk inserts do not send the signals which invalidate cached values
+        caching.bump('memberships')
+
 
 class Membership(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE)
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    def __init__(self, object_list, previous_cursor, next_cursor):
+        self.object_list = object_list
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class KeysetPaginationMixin:
+    """Paginate a ListView by seeking past the last seen row instead of using OFFSET.
+
+    The ``keyset`` lists the ordering fields, which must end with a unique field.
+    Pages are addressed with an opaque cursor in the ``after`` or ``before`` query
+    parameter, so the cost of a page does not depend on how deep it is.
+    """
+    paginate_by = 25
+    keyset = ('-created', '-id')
+
+    def get_ordering(self):
+        return self.keyset
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+
+        if before:
+            ordering = [self._invert(field) for field in self.keyset]
+            queryset = queryset.filter(self._seek(self._decode(queryset, before), ordering))
+        elif after:
+            ordering = list(self.keyset)
+            queryset = queryset.filter(self._seek(self._decode(queryset, after), ordering))
+        else:
+            ordering = list(self.keyset)
+
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if before:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = bool(after), has_more
+
+        page = KeysetPage(
+            rows,
+            previous_cursor=self._encode(rows[0]) if rows and has_previous else None,
+            next_cursor=self._encode(rows[-1]) if rows and has_next else None,
+        )
+        return None, page, rows, page.has_other_pages()
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f"-{field}"
+
+    @staticmethod
+    def _seek(values, ordering):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f"{name}__{lookup}": values[name]})
+            for previous in ordering[:index]:
+                step &= Q(**{previous.lstrip('-'): values[previous.lstrip('-')]})
+            condition |= step
+        return condition
+
+    def _encode(self, obj):
+        values = [getattr(obj, field.lstrip('-')) for field in self.keyset]
+        data = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def _decode(self, queryset, cursor):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            names = [field.lstrip('-') for field in self.keyset]
+            if len(data) != len(names):
+                raise ValueError(cursor)
+            return {
+                name: queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(names, data)
+            }
+        except (ValueError, TypeError, ValidationError):
+            raise Http404("Ungültige Seite.")
@@ -0,0 +1,22 @@
+"""Run sync code, like ORM queries, on the thread pool of asgiref from async code."""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def in_pool(func):
+    """Return a coroutine function calling ``func`` on a pool thread.
+
+    Pool threads are not covered by the request_started/finished signals, so the
+    connections of the thread are closed before and after each call, as for requests.
+    """
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
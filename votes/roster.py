@@ -0,0 +1,17 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from . import caching
+
+
+def get_roster(user):
+    """Return (id, display name) pairs of all members of the user's teams, ordered for display."""
+    key = caching.make_key(['memberships', 'users'], 'roster', user.pk)
+    roster = cache.get(key)
+    if roster is None:
+        members = User.objects.filter(
+            teams__in=user.teams.all(),
+        ).distinct().order_by('first_name', 'last_name')
+        roster = [(member.pk, member.get_full_name()) for member in members.only('first_name', 'last_name')]
+        cache.set(key, roster)
+    return roster
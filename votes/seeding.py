@@ -0,0 +1,282 @@
+"""Generate a realistic dataset for benchmarks and local development.
+
+At scale 1 the dataset has 50 teams, 2,000 users, 5,000 decisions and about
+200,000 votes. The generator is seeded, so the same scale always yields the same
+data. Primary keys are assigned up front, so no rows have to be read back, and the
+million-row tables are written as plain multi-row inserts.
+"""
+import random
+
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from mentoring.models import Mentor, Program
+
+from . import caching
+from .models import Decision, Invitation, Membership, Option, OptionTemplate, Team, Vote
+
+TEAMS = 50
+USERS = 2000
+DECISIONS = 5000
+VOTES = 200000
+MENTORS = 200
+
+FIRST_NAMES = ["Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hannes", "Ida", "Jonas", "Lea", "Max"]
+LAST_NAMES = ["Bauer", "Fischer", "Hoffmann", "Koch", "Meyer", "Müller", "Richter", "Schmidt", "Schulz", "Wagner"]
+
+# share of closed, open and pending decisions
+STATES = [(Decision.CLOSED, 0.7), (Decision.OPEN, 0.25), (Decision.PENDING, 0.05)]
+
+BATCH_SIZE = 2000
+
+
+def scaled(count, scale, minimum=1):
+    return max(minimum, round(count * scale))
+
+
+def next_pk(model):
+    return (model.objects.aggregate(pk=models.Max('pk'))['pk'] or 0) + 1
+
+
+def insert_rows(model, fields, rows):
+    """Insert tuples of prepared values in batches, without instantiating the model."""
+    columns = [model._meta.get_field(name) for name in fields]
+    batch_size = connection.ops.bulk_batch_size(columns, [None] * BATCH_SIZE) or BATCH_SIZE
+    placeholder = f"({', '.join(['%s'] * len(columns))})"
+    prefix = "INSERT INTO {} ({}) VALUES ".format(
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in columns),
+    )
+
+    rows = iter(rows)
+    count = 0
+    with connection.cursor() as wrapper:
+        # bypass the query log of DEBUG, which would keep every statement in memory
+        cursor = wrapper.cursor
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return count
+            cursor.execute(prefix + ", ".join([placeholder] * len(batch)), [value for row in batch for value in row])
+            count += len(batch)
+
+
+@transaction.atomic
+def seed(scale=1.0, seed=0, password=None, teams=None, users=None, decisions=None, votes=None, mentors=None):
+    """Add a dataset to the database and return the number of created rows per model.
+
+    The counts default to the full dataset multiplied by ``scale``. All users get the
+    given password, or an unusable one, hashed only once.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    teams = seed_teams(teams or scaled(TEAMS, scale))
+    user_ids = seed_users(users or scaled(USERS, scale, minimum=2), password, rng)
+    members = seed_memberships(teams, user_ids, rng, now)
+    invitations = seed_invitations(teams, members, now)
+    decisions, votes = seed_decisions(
+        decisions or scaled(DECISIONS, scale),
+        votes if votes is not None else scaled(VOTES, scale),
+        members,
+        rng,
+        now,
+    )
+    mentors = seed_mentors(mentors or scaled(MENTORS, scale), rng)
+
+    # explicit primary keys bypass the sequences of PostgreSQL
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [
+            User, Team, Membership, Invitation, Invitation.teams.through, Decision, Decision.voters.through,
+            Option, Vote, Program, Mentor,
+        ]):
+            cursor.execute(sql)
+    # most rows bypass the signals which invalidate cached values
+    caching.bump(*caching.NAMESPACES)
+
+    return {
+        'teams': len(teams),
+        'users': len(user_ids),
+        'invitations': invitations,
+        'decisions': decisions,
+        'votes': votes,
+        'mentors': mentors,
+    }
+
+
+def seed_teams(count):
+    first = next_pk(Team)
+    teams = [Team(pk=pk, name=f"Team {pk}", slug=f'team-{pk}') for pk in range(first, first + count)]
+    Team.objects.bulk_create(teams)
+    return [team.pk for team in teams]
+
+
+def seed_users(count, password, rng):
+    hashed = make_password(password)
+    first = next_pk(User)
+    User.objects.bulk_create((
+        User(
+            pk=pk,
+            username=f'user{pk}',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            email=f'user{pk}@example.com',
+            password=hashed,
+        )
+        for pk in range(first, first + count)
+    ), batch_size=BATCH_SIZE)
+    return list(range(first, first + count))
+
+
+def seed_memberships(teams, user_ids, rng, now):
+    """Put every user into one team and every tenth user into a second one."""
+    members = {team_id: [] for team_id in teams}
+    for i, user_id in enumerate(user_ids):
+        team_id = teams[i % len(teams)]
+        members[team_id].append(user_id)
+        if i % 10 == 0 and len(teams) > 1:
+            # a different team, so unique_member holds
+            other = teams[(i % len(teams) + rng.randrange(1, len(teams))) % len(teams)]
+            members[other].append(user_id)
+
+    created = Membership._meta.get_field('created').get_db_prep_save(now, connection)
+    first = next_pk(Membership)
+    insert_rows(Membership, ['id', 'team', 'user', 'created'], (
+        (pk, team_id, user_id, created)
+        for pk, (team_id, user_id) in enumerate(
+            ((team_id, user_id) for team_id, user_ids in members.items() for user_id in user_ids),
+            start=first,
+        )
+    ))
+    return members
+
+
+def seed_invitations(teams, members, now):
+    first = next_pk(Invitation)
+    invitations = [
+        Invitation(
+            pk=first + 2 * index + i,
+            token=f'seed-{first + 2 * index + i}',
+            expiry=now + timedelta(days=7 if i else -7),
+            creator_id=members[team_id][0],
+        )
+        for index, team_id in enumerate(teams)
+        for i in range(2)
+        if members[team_id]
+    ]
+    Invitation.objects.bulk_create(invitations)
+
+    team_ids = {first + 2 * index + i: team_id for index, team_id in enumerate(teams) for i in range(2)}
+    Invitation.teams.through.objects.bulk_create(
+        Invitation.teams.through(invitation_id=invitation.pk, team_id=team_ids[invitation.pk])
+        for invitation in invitations
+    )
+    return len(invitations)
+
+
+def seed_decisions(count, vote_target, members, rng, now):
+    template = OptionTemplate.objects.first() or OptionTemplate.objects.create(
+        name="Dafür / Dagegen / Enthaltung",
+        options="Dafür\nDagegen\nEnthaltung",
+    )
+    texts = template.get_options()
+    teams = [team_id for team_id, user_ids in members.items() if user_ids]
+
+    plans = []
+    for _ in range(count):
+        team_id = rng.choice(teams)
+        state = rng.choices([state for state, _ in STATES], [share for _, share in STATES])[0]
+        if state == Decision.CLOSED:
+            start = now - timedelta(days=rng.randint(2, 365))
+            end = start + timedelta(hours=rng.randint(1, 24))
+        elif state == Decision.OPEN:
+            start = now - timedelta(hours=rng.randint(1, 24))
+            end = now + timedelta(hours=rng.randint(1, 72))
+        else:
+            start = now + timedelta(days=rng.randint(1, 30))
+            end = start + timedelta(hours=rng.randint(1, 24))
+        plans.append((team_id, state, start, end))
+
+    slots = sum(len(members[team_id]) for team_id, state, _, _ in plans if state != Decision.PENDING)
+    # some voters always abstain, so not every open decision is closed early
+    turnout = min(0.95, vote_target / slots) if slots else 0
+
+    first_decision, first_option = next_pk(Decision), next_pk(Option)
+    decisions, options, voters, votes = [], [], [], []
+    for index, (team_id, state, start, end) in enumerate(plans):
+        decision_id = first_decision + index
+        option_ids = [first_option + len(texts) * index + i for i in range(len(texts))]
+        tallies = [0] * len(texts)
+
+        for user_id in members[team_id]:
+            voters.append((decision_id, user_id))
+            if state != Decision.PENDING and rng.random() < turnout:
+                # one option per voter, so unique_vote holds
+                choice = rng.randrange(len(texts))
+                tallies[choice] += 1
+                votes.append((user_id, option_ids[choice]))
+
+        ballots = sum(tallies)
+        if state == Decision.OPEN and ballots == len(members[team_id]):
+            # closed early
+            state = Decision.CLOSED
+        decisions.append(Decision(
+            pk=decision_id,
+            subject=f"Antrag {decision_id}",
+            author_id=members[team_id][0],
+            template=template,
+            start=start,
+            end=end,
+            status=state,
+            ballots=ballots,
+        ))
+        options.extend(
+            Option(pk=option_id, decision_id=decision_id, text=text, tally=tally)
+            for option_id, text, tally in zip(option_ids, texts, tallies)
+        )
+
+    Decision.objects.bulk_create(decisions, batch_size=BATCH_SIZE)
+    Option.objects.bulk_create(options, batch_size=BATCH_SIZE)
+
+    first = next_pk(Decision.voters.through)
+    insert_rows(Decision.voters.through, ['id', 'decision', 'user'], (
+        (pk, decision_id, user_id) for pk, (decision_id, user_id) in enumerate(voters, start=first)
+    ))
+
+    created = Vote._meta.get_field('created').get_db_prep_save(now, connection)
+    first = next_pk(Vote)
+    insert_rows(Vote, ['id', 'user', 'option', 'created'], (
+        (pk, user_id, option_id, created) for pk, (user_id, option_id) in enumerate(votes, start=first)
+    ))
+
+    return len(decisions), len(votes)
+
+
+def seed_mentors(count, rng):
+    if not Program.objects.exists():
+        Program.objects.bulk_create(
+            Program(faculty=faculty, name=f"{name} {degree}")
+            for faculty, name in Program.FACULTIES
+            for degree in ["(B.Sc.)", "(M.Sc.)"]
+        )
+    programs = list(Program.objects.values_list('pk', flat=True))
+
+    first = next_pk(Mentor)
+    Mentor.objects.bulk_create((
+        Mentor(
+            pk=pk,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            email=f'mentor{pk}@example.com',
+            phone=f"0391 {100000 + pk}",
+            program_id=rng.choice(programs),
+        )
+        for pk in range(first, first + count)
+    ), batch_size=BATCH_SIZE)
+    return count
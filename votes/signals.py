@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, live
+from .models import Decision, Invitation, Membership, Option, Team, Vote
+
+# cache namespace of every model whose changes invalidate cached values
+NAMESPACES = {
+    Decision: 'decisions',
+    Vote: 'votes',
+    Membership: 'memberships',
+    Team: 'teams',
+    Invitation: 'invitations',
+}
+
+# cache namespace of every many-to-many relation, whose rows are only changed through m2m_changed
+# or deleted along with a model above
+RELATIONS = {
+    Decision.voters.through: 'decisions',
+    Invitation.teams.through: 'invitations',
+}
+
+
+def invalidate_namespace(sender, **kwargs):
+    caching.bump(NAMESPACES[sender])
+
+
+def invalidate_relation(sender, action, **kwargs):
+    if action.startswith('post_'):
+        caching.bump(RELATIONS[sender])
+
+
+# connected per sender, a post_delete receiver for all models would make every cascade
+# load the rows and send a signal for each instead of deleting them with one query
+for model in NAMESPACES:
+    post_save.connect(invalidate_namespace, sender=model)
+    post_delete.connect(invalidate_namespace, sender=model)
+for relation in RELATIONS:
+    m2m_changed.connect(invalidate_relation, sender=relation)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_users(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        # the display names did not change
+        return
+    caching.bump('users')
+
+
+def notify_on_commit(decision_id):
+    # the tallies and the status are updated later in the same transaction
+    transaction.on_commit(lambda: live.notify(decision_id))
+
+
+@receiver(post_save, sender=Vote)
+def notify_watchers(sender, instance, **kwargs):
+    notify_on_commit(instance.option.decision_id)
+
+
+@receiver(post_delete, sender=Vote)
+def notify_watchers_of_deleted_vote(sender, instance, **kwargs):
+    # votes deleted by the cascade of their option or decision come without the option,
+    # looking it up would cost a query per vote, the deleted option notifies once instead
+    if Vote.option.is_cached(instance):
+        notify_on_commit(instance.option.decision_id)
+
+
+@receiver(post_delete, sender=Option)
+def notify_watchers_of_deleted_option(sender, instance, **kwargs):
+    notify_on_commit(instance.decision_id)
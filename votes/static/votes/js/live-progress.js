@@ -0,0 +1,21 @@
+document.addEventListener('DOMContentLoaded', () => {
+    let $progress = document.getElementById('live-progress');
+    if (!$progress || !window.EventSource || $progress.dataset.state === 'closed') {
+        return;
+    }
+
+    let source = new EventSource($progress.dataset.url);
+
+    source.addEventListener('message', (event) => {
+        let progress = JSON.parse(event.data);
+
+        $progress.querySelector('.voted').textContent = progress.voted;
+        $progress.querySelector('.voters').textContent = progress.voters;
+
+        if (progress.state !== $progress.dataset.state) {
+            // the buttons depend on the state
+            source.close();
+            window.location.reload();
+        }
+    });
+});
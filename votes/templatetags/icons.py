@@ -0,0 +1,29 @@
+from django import template
+from django.utils.html import format_html
+
+from ..icons import get_sprite, get_view_boxes
+
+register = template.Library()
+
+
+@register.simple_tag
+def icon_sprite():
+    """Render the symbols of all used icons, once per page before the first icon."""
+    return get_sprite()
+
+
+@register.simple_tag
+def icon(classes):
+    """Render an icon of the sprite from Font Awesome classes like ``fas fa-lock fa-sm``."""
+    prefix, *names = classes.split()
+    view_boxes = get_view_boxes()
+    for name in names:
+        symbol = f"{prefix}-{name[3:]}"
+        if symbol in view_boxes:
+            return format_html(
+                '<svg class="{}" viewBox="{}" aria-hidden="true" focusable="false"><use href="#{}"></use></svg>',
+                ' '.join(['svg-inline--fa', name] + [other for other in names if other != name]),
+                view_boxes[symbol],
+                symbol,
+            )
+    raise template.TemplateSyntaxError(f"Icon '{classes}' is not in the sprite, run the build_icons command.")
@@ -1,3 +1,1054 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
 
-# Create your tests here.
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.deletion import Collector
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from outbox.models import Message
+
+from . import caching, live
+from .assets import source_files
+from .icons import build_sprite, get_sprite, used_icons
+from .live import LiveProgressRouter
+from .management.commands import purge_css
+from .models import Decision, Option, OptionTemplate, Vote, Team, Invitation, Membership, Snapshot
+
+
+class DecisionTestMixin:
+    @classmethod
+    def create_users(cls, count, prefix='user'):
+        return [
+            User.objects.create_user(f"{prefix}{i}", first_name="Max", last_name=f"Muster{i}")
+            for i in range(count)
+        ]
+
+    @classmethod
+    def create_decision(cls, author, voters, start=None, end=None, subject="Antrag"):
+        now = timezone.now()
+        decision = Decision.objects.create(
+            subject=subject,
+            author=author,
+            start=start or now - timedelta(minutes=5),
+            end=end or now + timedelta(hours=1),
+        )
+        decision.voters.set(voters)
+        for text in ["Dafür", "Dagegen", "Enthaltung"]:
+            Option.objects.create(decision=decision, text=text)
+        return decision
+
+
+class DecisionParticipationTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.voters = cls.create_users(3)
+        team = Team.objects.create(name="Fachschaftsrat", slug='fsr')
+        for user in [cls.author, *cls.voters]:
+            Membership.objects.create(team=team, user=user)
+
+    def test_participation_annotations(self):
+        decision = self.create_decision(self.author, self.voters)
+        Vote.objects.create(user=self.voters[0], option=decision.options.first())
+        empty = self.create_decision(self.author, [])
+
+        annotated = {d.pk: d for d in Decision.objects.with_participation()}
+        self.assertEqual((annotated[decision.pk].voter_count, annotated[decision.pk].voted_count), (3, 1))
+        self.assertEqual((annotated[empty.pk].voter_count, annotated[empty.pk].voted_count), (0, 0))
+        self.assertEqual(annotated[empty.pk].pending_voters(), [])
+
+    def test_pending_voters(self):
+        decision = self.create_decision(self.author, self.voters)
+        Vote.objects.create(user=self.voters[0], option=decision.options.first())
+        self.assertCountEqual(decision.pending_voters(), self.voters[1:])
+
+    def test_list_query_count_is_constant(self):
+        self.client.force_login(self.voters[0])
+        self.create_decision(self.author, self.voters)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('votes:decisions'))
+
+        for _ in range(10):
+            self.create_decision(self.author, self.voters)
+
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('votes:decisions'))
+
+        self.assertEqual(len(response.context['decision_list']), 11)
+        self.assertEqual(len(small), len(large))
+
+
+class DecisionStatusTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.voters = cls.create_users(2)
+
+    def test_initial_status(self):
+        now = timezone.now()
+        upcoming = self.create_decision(self.author, self.voters, start=now + timedelta(hours=1),
+                                        end=now + timedelta(hours=2))
+        running = self.create_decision(self.author, self.voters)
+
+        self.assertEqual(upcoming.status, Decision.PENDING)
+        self.assertEqual(running.status, Decision.OPEN)
+
+    def test_scheduler_advances_status(self):
+        now = timezone.now()
+        upcoming = self.create_decision(self.author, self.voters, start=now + timedelta(minutes=1),
+                                        end=now + timedelta(hours=1))
+        running = self.create_decision(self.author, self.voters)
+        finished = self.create_decision(self.author, self.voters[:1])
+        Vote.objects.create(user=self.voters[0], option=finished.options.first())
+
+        Decision.objects.filter(pk=running.pk).update(end=now - timedelta(minutes=1))
+        Decision.objects.filter(pk=upcoming.pk).update(start=now - timedelta(minutes=1))
+        call_command('run_decision_scheduler', stdout=StringIO())
+
+        statuses = dict(Decision.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[upcoming.pk], Decision.OPEN)
+        self.assertEqual(statuses[running.pk], Decision.CLOSED)
+        self.assertEqual(statuses[finished.pk], Decision.CLOSED)
+
+    def test_extending_end_reopens_decision(self):
+        now = timezone.now()
+        decision = self.create_decision(self.author, self.voters, start=now - timedelta(hours=2),
+                                        end=now - timedelta(hours=1))
+        self.assertEqual(decision.status, Decision.CLOSED)
+
+        decision.end = now + timedelta(hours=1)
+        decision.save()
+        self.assertEqual(decision.status, Decision.OPEN)
+
+    def test_closed_early_stays_closed(self):
+        decision = self.create_decision(self.author, self.voters[:1])
+        decision.cast_vote(self.voters[0], decision.options.first())
+        decision.refresh_from_db()
+
+        decision.end += timedelta(hours=1)
+        decision.save()
+        self.assertEqual(decision.status, Decision.CLOSED)
+
+    def test_last_vote_closes_decision(self):
+        decision = self.create_decision(self.author, self.voters[:1])
+        self.client.force_login(self.voters[0])
+        self.client.post(reverse('votes:vote', args=[decision.pk]), {'option': decision.options.first().pk})
+
+        decision.refresh_from_db()
+        self.assertEqual(decision.status, Decision.CLOSED)
+        self.assertEqual(decision.state()['code'], 'closed')
+
+
+class VoteTallyTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.voters = cls.create_users(2)
+        cls.decision = cls.create_decision(cls.author, cls.voters)
+
+    def test_vote_updates_tallies(self):
+        option = self.decision.options.first()
+        self.client.force_login(self.voters[0])
+        response = self.client.post(reverse('votes:vote', args=[self.decision.pk]), {'option': option.pk})
+
+        self.assertRedirects(response, reverse('votes:decisions'))
+        option.refresh_from_db()
+        self.decision.refresh_from_db()
+        self.assertEqual(option.tally, 1)
+        self.assertEqual(self.decision.ballots, 1)
+
+    def test_vote_is_rejected_for_non_voters_and_repeated_votes(self):
+        option, other = self.decision.options.all()[:2]
+        outsider = User.objects.create_user('outsider')
+
+        self.client.force_login(outsider)
+        response = self.client.post(reverse('votes:vote', args=[self.decision.pk]), {'option': option.pk})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.voters[0])
+        self.client.post(reverse('votes:vote', args=[self.decision.pk]), {'option': option.pk})
+        response = self.client.post(reverse('votes:vote', args=[self.decision.pk]), {'option': other.pk})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Vote.objects.filter(user=self.voters[0]).count(), 1)
+
+    def test_vote_query_count_is_constant(self):
+        option = self.decision.options.first()
+        self.client.force_login(self.voters[0])
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(reverse('votes:vote', args=[self.decision.pk]), {'option': option.pk})
+
+        crowded = self.create_decision(self.author, [*self.voters, *self.create_users(20, prefix='crowd')])
+        option = crowded.options.first()
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(reverse('votes:vote', args=[crowded.pk]), {'option': option.pk})
+
+        self.assertEqual(len(small), len(large))
+
+    def test_recount_tallies(self):
+        option = self.decision.options.first()
+        Vote.objects.create(user=self.voters[0], option=option)
+
+        with self.assertRaises(CommandError):
+            call_command('recount_tallies', '--check', stdout=StringIO())
+
+        call_command('recount_tallies', stdout=StringIO())
+        option.refresh_from_db()
+        self.decision.refresh_from_db()
+        self.assertEqual(option.tally, 1)
+        self.assertEqual(self.decision.ballots, 1)
+        call_command('recount_tallies', '--check', stdout=StringIO())
+
+
+class TeamsTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user', email="user@st.ovgu.de")
+        cls.own_team = Team.objects.create(name="Fachschaftsrat", slug='fsr')
+        cls.other_team = Team.objects.create(name="Senat", slug='senat')
+        Membership.objects.create(team=cls.own_team, user=cls.user)
+
+    def add_members(self, team, count, prefix):
+        for user in self.create_users(count, prefix=prefix):
+            user.email = f"{user.username}@st.ovgu.de"
+            user.save()
+            Membership.objects.create(team=team, user=user)
+
+    def test_email_visibility(self):
+        self.add_members(self.own_team, 1, 'friend')
+        self.add_members(self.other_team, 1, 'stranger')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('votes:teams'))
+
+        self.assertContains(response, "friend0@st.ovgu.de")
+        self.assertNotContains(response, "stranger0@st.ovgu.de")
+
+    def test_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        self.add_members(self.own_team, 2, 'a')
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('votes:teams'))
+
+        self.add_members(self.own_team, 10, 'b')
+        self.add_members(self.other_team, 10, 'c')
+
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse('votes:teams'))
+
+        self.assertEqual(len(small), len(large))
+
+
+class KeysetPaginationTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        now = timezone.now()
+        cls.decisions = [
+            cls.create_decision(cls.author, [], start=now - timedelta(days=2, hours=i),
+                                end=now - timedelta(days=1, hours=i // 2), subject=f"Antrag {i}")
+            for i in range(60)
+        ]
+
+    def test_pages_cover_all_rows_in_order(self):
+        self.client.force_login(self.author)
+        expected = sorted(self.decisions, key=lambda d: (d.end, d.pk), reverse=True)
+
+        seen = []
+        response = self.client.get(reverse('votes:results'))
+        while True:
+            page = response.context['page_obj']
+            seen.extend(page.object_list)
+            if not page.has_next():
+                break
+            response = self.client.get(reverse('votes:results'), {'after': page.next_cursor})
+
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(reverse('votes:results'), {'before': page.previous_cursor})
+        self.assertEqual(list(previous.context['page_obj']), expected[25:50])
+
+    def test_invalid_cursor(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('votes:results'), {'after': "invalid"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_results_cutoff_is_evaluated_per_request(self):
+        self.client.force_login(self.author)
+        decision = self.create_decision(self.author, [])
+        # ends after the views module was imported
+        Decision.objects.filter(pk=decision.pk).update(end=timezone.now() - timedelta(milliseconds=1))
+
+        response = self.client.get(reverse('votes:results'))
+        self.assertIn(decision, response.context['page_obj'].object_list)
+
+
+class ResultCacheTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        now = timezone.now()
+        cls.decision = cls.create_decision(cls.author, [cls.author], start=now - timedelta(hours=2),
+                                           end=now - timedelta(hours=1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_result_is_frozen_until_snapshot_is_discarded(self):
+        url = reverse('votes:result', args=[self.decision.pk])
+        self.assertContains(self.client.get(url), "Dafür")
+
+        self.decision.options.filter(text="Dafür").update(text="Ja")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(url), "Dafür")
+        self.assertFalse(any('votes_option' in query['sql'] for query in queries))
+
+        self.decision.discard_snapshot()
+        self.assertContains(self.client.get(url), "Ja")
+
+    def test_conditional_requests(self):
+        url = reverse('votes:result-export', args=[self.decision.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('votes_' in query['sql'] for query in queries))
+
+    def test_page_is_not_conditional(self):
+        # the navigation of the page depends on the user, not only on the snapshot
+        response = self.client.get(reverse('votes:result', args=[self.decision.pk]))
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_export(self):
+        response = self.client.get(reverse('votes:result-export', args=[self.decision.pk]))
+        self.assertEqual(response.json()['options'][0], {'text': "Dafür", 'votes': 0})
+
+    def test_result_is_built_from_tallies(self):
+        self.decision.options.filter(text="Dafür").update(tally=1)
+        Decision.objects.filter(pk=self.decision.pk).update(ballots=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('votes:result-export', args=[self.decision.pk]))
+        self.assertEqual(response.json()['options'][0], {'text': "Dafür", 'votes': 1})
+        self.assertEqual(response.json()['voted'], 1)
+        self.assertFalse(any('votes_vote' in query['sql'] for query in queries))
+
+    def test_admin_discards_snapshot(self):
+        self.decision.freeze()
+        admin = User.objects.create_superuser('admin')
+        self.client.force_login(admin)
+
+        option = self.decision.options.last()
+        self.client.post(reverse('admin:votes_option_changelist'), {
+            'action': 'delete_selected', '_selected_action': [option.pk], 'post': 'yes',
+        })
+        self.assertFalse(Option.objects.filter(pk=option.pk).exists())
+        self.assertFalse(Snapshot.objects.filter(decision=self.decision).exists())
+
+    def test_admin_keeps_options_with_votes(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        option = self.decision.options.first()
+        Option.objects.filter(pk=option.pk).update(tally=1)
+
+        response = self.client.post(reverse('admin:votes_option_delete', args=[option.pk]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Option.objects.filter(pk=option.pk).exists())
+
+    def test_result_fragment_is_cached_per_decision(self):
+        other = self.create_decision(self.author, [self.author], start=self.decision.start, end=self.decision.end)
+        # an equal result has an equal ETag
+        Decision.objects.filter(pk=other.pk).update(subject=self.decision.subject, created=self.decision.created)
+
+        self.client.get(reverse('votes:result', args=[self.decision.pk]))
+        response = self.client.get(reverse('votes:result', args=[other.pk]))
+        self.assertContains(response, f"Abstimmung {other.pk}")
+
+    def test_admin_cannot_change_votes(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        self.assertEqual(self.client.get(reverse('admin:votes_vote_add')).status_code, 403)
+
+    def test_open_decision_result_is_forbidden(self):
+        decision = self.create_decision(self.author, [self.author])
+        response = self.client.get(reverse('votes:result', args=[decision.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class JoinTeamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creator')
+        cls.user = User.objects.create_user('user')
+        cls.teams = [Team.objects.create(name=f"Team {i}", slug=f'team-{i}') for i in range(5)]
+
+    def create_invitation(self, teams, token='token'):
+        invitation = Invitation.objects.create(token=token, creator=self.creator,
+                                               expiry=timezone.now() + timedelta(hours=8))
+        invitation.teams.set(teams)
+        return invitation
+
+    def test_join_is_idempotent(self):
+        Membership.objects.create(team=self.teams[0], user=self.user)
+        self.create_invitation(self.teams)
+        self.client.force_login(self.user)
+
+        for _ in range(2):
+            response = self.client.post(reverse('votes:join'), {'token': 'token'})
+            self.assertRedirects(response, reverse('votes:invitations'))
+
+        self.assertEqual(Membership.objects.filter(user=self.user).count(), 5)
+
+    def test_join_query_count_is_constant(self):
+        self.create_invitation(self.teams[:1], token='small')
+        self.create_invitation(self.teams, token='large')
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(reverse('votes:join'), {'token': 'small'})
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(reverse('votes:join'), {'token': 'large'})
+
+        self.assertEqual(len(small), len(large))
+
+    def test_registration(self):
+        self.create_invitation(self.teams[:2])
+        response = self.client.post(reverse('votes:registration'), {
+            'token': 'token',
+            'first_name': "erika",
+            'last_name': "musterfrau",
+            'username': "Erika",
+            'email': "erika@st.ovgu.de",
+        })
+
+        self.assertRedirects(response, reverse('votes:registration-done'))
+        user = User.objects.get(username='erika')
+        self.assertEqual(user.teams.count(), 2)
+        self.assertTrue(Message.objects.filter(recipients=["erika@st.ovgu.de"]).exists())
+
+    def test_expired_token_is_rejected(self):
+        invitation = self.create_invitation(self.teams)
+        Invitation.objects.filter(pk=invitation.pk).update(expiry=timezone.now() - timedelta(minutes=1))
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('votes:join'), {'token': 'token'})
+        self.assertFormError(response, 'form', 'token', "Der Token ist abgelaufen.")
+        self.assertEqual(sum('votes_invitation' in query['sql'] for query in queries), 1)
+
+    def test_purge_invitations(self):
+        expired = self.create_invitation(self.teams, token='expired')
+        valid = self.create_invitation(self.teams, token='valid')
+        Invitation.objects.filter(pk=expired.pk).update(expiry=timezone.now() - timedelta(days=2))
+        membership = Membership.objects.create(team=self.teams[0], user=self.user, invitation=expired)
+
+        call_command('purge_invitations', '--batch-size', '1', '--older-than', '3', stdout=StringIO())
+        self.assertTrue(Invitation.objects.filter(pk=expired.pk).exists())
+
+        call_command('purge_invitations', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(list(Invitation.objects.all()), [valid])
+        membership.refresh_from_db()
+        self.assertIsNone(membership.invitation)
+
+
+class InvitationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user')
+        cls.own_teams = [Team.objects.create(name=f"Team {i}", slug=f'team-{i}') for i in range(3)]
+        cls.other_team = Team.objects.create(name="Senat", slug='senat')
+        for team in cls.own_teams:
+            Membership.objects.create(team=team, user=cls.user)
+
+    def create_invitations(self, count, teams, prefix='token'):
+        expiry = timezone.now() + timedelta(hours=8)
+        # pks are not returned by bulk inserts on SQLite, so the rows are fetched again
+        User.objects.bulk_create([User(username=f"{prefix}-creator{i}") for i in range(count)])
+        creators = User.objects.filter(username__startswith=f"{prefix}-creator")
+        Invitation.objects.bulk_create([
+            Invitation(token=f"{prefix}{i}", expiry=expiry, creator=creator)
+            for i, creator in enumerate(creators)
+        ])
+        invitations = Invitation.objects.filter(token__startswith=prefix)
+        Invitation.teams.through.objects.bulk_create([
+            Invitation.teams.through(invitation=invitation, team=team)
+            for invitation in invitations for team in teams
+        ])
+        return invitations
+
+    def test_only_invitations_for_own_teams_are_listed(self):
+        own = self.create_invitations(1, self.own_teams[:2], prefix='own')
+        self.create_invitations(1, [self.own_teams[0], self.other_team], prefix='mixed')
+        self.create_invitations(1, [self.other_team], prefix='other')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('votes:invitations'))
+        self.assertEqual(list(response.context['invitation_list']), list(own))
+
+    def test_query_count_for_500_invitations(self):
+        self.create_invitations(500, self.own_teams)
+        self.client.force_login(self.user)
+
+        # session, user, team ids, invitations with creators, teams, navigation
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('votes:invitations'))
+        self.assertEqual(len(response.context['invitation_list']), 25)
+
+
+class DecisionCreateTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', first_name="Anna", last_name="Autorin")
+        cls.team = Team.objects.create(name="Fachschaftsrat", slug='fsr')
+        cls.members = cls.create_users(3)
+        for user in [cls.author, *cls.members]:
+            Membership.objects.create(team=cls.team, user=user)
+        cls.outsider = User.objects.create_user('outsider')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def post_decision(self, voters, template=None):
+        now = timezone.localtime()
+        return self.client.post(reverse('votes:create'), {
+            'subject': "Antrag",
+            'template': (template or OptionTemplate.objects.first()).pk,
+            'voters': [voter.pk for voter in voters],
+            'start': now.strftime('%d.%m.%Y %H:%M'),
+            'end': (now + timedelta(hours=1)).strftime('%d.%m.%Y %H:%M'),
+        })
+
+    def test_create_decision(self):
+        response = self.post_decision(self.members)
+
+        self.assertRedirects(response, reverse('votes:decisions'))
+        decision = Decision.objects.get()
+        self.assertCountEqual(decision.voters.all(), self.members)
+        self.assertEqual([option.text for option in decision.options.all()], ["Dafür", "Dagegen", "Enthaltung"])
+
+    def test_options_are_copied_from_template(self):
+        template = OptionTemplate.objects.create(name="Wahl", options="Anna\n\nBernd\nCarla\nDavid\n")
+        default_template = OptionTemplate.objects.first()
+        self.client.get(reverse('votes:create'))
+        with CaptureQueriesContext(connection) as default:
+            self.post_decision(self.members, template=default_template)
+        with CaptureQueriesContext(connection) as custom:
+            self.post_decision(self.members, template=template)
+
+        decision = Decision.objects.get(template=template)
+        self.assertEqual([option.text for option in decision.options.all()], ["Anna", "Bernd", "Carla", "David"])
+        self.assertEqual(len(default), len(custom))
+
+    def test_voters_outside_roster_are_rejected(self):
+        response = self.post_decision([self.outsider])
+        self.assertEqual(response.context['form'].errors.as_data()['voters'][0].code, 'invalid_choice')
+
+    def test_roster_is_cached_and_invalidated_by_memberships(self):
+        self.client.get(reverse('votes:create'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('votes:create'))
+        self.assertFalse(any('SELECT DISTINCT' in query['sql'] for query in queries))
+
+        Membership.objects.create(team=self.team, user=self.outsider)
+        response = self.client.get(reverse('votes:create'))
+        self.assertIn((self.outsider.pk, ""), response.context['form'].fields['voters'].choices)
+
+
+class AgendaImportTests(DecisionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.team = Team.objects.create(name="Fachschaftsrat", slug='fsr')
+        cls.members = cls.create_users(3)
+        for user in [cls.author, *cls.members]:
+            Membership.objects.create(team=cls.team, user=user)
+        cls.template = OptionTemplate.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def window(self):
+        now = timezone.localtime()
+        return now.strftime('%d.%m.%Y %H:%M'), (now + timedelta(hours=1)).strftime('%d.%m.%Y %H:%M')
+
+    def test_import_from_text_and_file(self):
+        start, end = self.window()
+        agenda = SimpleUploadedFile('agenda.json', json.dumps(["TOP 3", {'subject': "TOP 4"}]).encode())
+        response = self.client.post(reverse('votes:import'), {
+            'subjects': "TOP 1\n\nTOP 2\n",
+            'agenda': agenda,
+            'template': self.template.pk,
+            'voters': [member.pk for member in self.members],
+            'start': start,
+            'end': end,
+        })
+
+        self.assertRedirects(response, reverse('votes:owned'))
+        decisions = Decision.objects.order_by('pk')
+        self.assertEqual([decision.subject for decision in decisions], ["TOP 1", "TOP 2", "TOP 3", "TOP 4"])
+        for decision in decisions:
+            self.assertEqual(decision.status, Decision.OPEN)
+            self.assertCountEqual(decision.voters.all(), self.members)
+            self.assertEqual(decision.options.count(), 3)
+
+    def test_subjects_must_be_strings(self):
+        start, end = self.window()
+        for items in [["TOP 1", None], [{'subject': None}], [{'subject': 3}]]:
+            response = self.client.post(reverse('votes:import'), {
+                'agenda': SimpleUploadedFile('agenda.json', json.dumps(items).encode()),
+                'template': self.template.pk,
+                'voters': [self.members[0].pk],
+                'start': start,
+                'end': end,
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("ist kein Text", response.context['form'].errors['agenda'][0])
+        self.assertFalse(Decision.objects.exists())
+
+    def test_nothing_is_imported_if_a_subject_is_invalid(self):
+        start, end = self.window()
+        response = self.client.post(reverse('votes:import'), {
+            'subjects': f"TOP 1\n{'x' * 256}",
+            'template': self.template.pk,
+            'voters': [self.members[0].pk],
+            'start': start,
+            'end': end,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors()[0].startswith("Gegenstand 2:"))
+        self.assertFalse(Decision.objects.exists())
+
+    def test_command(self):
+        now = timezone.localtime()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as agenda:
+            agenda.write("subject\nTOP 1\nTOP 2\n")
+            agenda.flush()
+            call_command('import_agenda', agenda.name, '--author', 'author',
+                         '--start', now.strftime('%Y-%m-%d %H:%M'),
+                         '--end', (now + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M'),
+                         stdout=StringIO())
+
+        self.assertEqual(Decision.objects.count(), 2)
+        self.assertEqual(Decision.objects.first().voters.count(), 4)
+
+
+class LiveProgressTests(DecisionTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.voters = self.create_users(2)
+        self.decision = self.create_decision(self.author, self.voters)
+        self.option = self.decision.options.first()
+
+    def login(self, user):
+        self.client.force_login(user)
+        session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        return [(b'cookie', f"{settings.SESSION_COOKIE_NAME}={session}".encode())]
+
+    def connect(self, headers=()):
+        scope = {
+            'type': 'http',
+            'path': reverse('votes:live', args=[self.decision.pk]),
+            'headers': list(headers),
+        }
+        requests, responses = asyncio.Queue(), asyncio.Queue()
+        task = asyncio.ensure_future(LiveProgressRouter(None)(scope, requests.get, responses.put))
+        return task, requests, responses
+
+    @staticmethod
+    def event(message):
+        return json.loads(message['body'].decode()[len('data: '):])
+
+    def test_votes_are_pushed_until_closed(self):
+        headers = self.login(self.voters[0])
+
+        async def watch():
+            task, requests, responses = self.connect(headers)
+            start = await responses.get()
+            events = [self.event(await responses.get())]
+            for voter in self.voters:
+                await sync_to_async(self.decision.cast_vote)(voter, self.option)
+                events.append(self.event(await asyncio.wait_for(responses.get(), 5)))
+            end = await asyncio.wait_for(responses.get(), 5)
+            await task
+            return start, events, end
+
+        start, events, end = async_to_sync(watch)()
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertEqual(events, [
+            {'voted': 0, 'voters': 2, 'state': 'open'},
+            {'voted': 1, 'voters': 2, 'state': 'open'},
+            {'voted': 2, 'voters': 2, 'state': 'closed'},
+        ])
+        self.assertFalse(end.get('more_body', False))
+        self.assertFalse(live.broker.has_subscribers(self.decision.pk))
+
+    def test_progress_is_computed_once_per_change(self):
+        headers = self.login(self.voters[0])
+
+        async def watch():
+            watchers = [self.connect(headers) for _ in range(5)]
+            for _, _, responses in watchers:
+                await responses.get()
+                await responses.get()
+
+            def notify():
+                with CaptureQueriesContext(connection) as queries:
+                    live.notify(self.decision.pk)
+                return queries
+
+            queries = await sync_to_async(notify)()
+
+            events = [self.event(await responses.get()) for _, _, responses in watchers]
+            for task, requests, _ in watchers:
+                await requests.put({'type': 'http.disconnect'})
+                await task
+            return queries, events
+
+        queries, events = async_to_sync(watch)()
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(events), 5)
+        self.assertFalse(live.broker.has_subscribers(self.decision.pk))
+
+    def test_cascade_does_not_query_per_vote(self):
+        for voter in self.voters:
+            self.decision.cast_vote(voter, self.option)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.option.delete()
+        self.assertFalse(any(query['sql'].startswith('SELECT "votes_option"') for query in queries))
+
+    def test_anonymous_watchers_are_rejected(self):
+        async def watch():
+            task, _, responses = self.connect()
+            await task
+            return await responses.get()
+
+        self.assertEqual(async_to_sync(watch)()['status'], 403)
+
+    def test_other_requests_are_passed_on(self):
+        calls = []
+
+        async def application(scope, receive, send):
+            calls.append(scope['path'])
+
+        router = LiveProgressRouter(application)
+        async_to_sync(router)({'type': 'http', 'path': reverse('votes:decisions')}, None, None)
+        self.assertEqual(calls, [reverse('votes:decisions')])
+
+    def test_info_page_and_wsgi_fallback(self):
+        Vote.objects.create(user=self.voters[0], option=self.option)
+        self.client.force_login(self.voters[0])
+
+        response = self.client.get(reverse('votes:info', args=[self.decision.pk]))
+        self.assertContains(response, reverse('votes:live', args=[self.decision.pk]))
+        self.assertEqual((response.context['decision'].voted_count, response.context['decision'].voter_count), (1, 2))
+
+        response = self.client.get(reverse('votes:live', args=[self.decision.pk]))
+        self.assertEqual(response.status_code, 204)
+
+
+class AsyncViewTests(DecisionTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.voters = self.create_users(2)
+        self.decision = self.create_decision(self.author, self.voters)
+
+    def get(self, path):
+        async def request():
+            return await self.async_client.get(path)
+
+        return async_to_sync(request)()
+
+    def test_views_are_served_under_asgi(self):
+        self.async_client.force_login(self.voters[0])
+        option = self.decision.options.first()
+
+        response = self.get(reverse('votes:decisions'))
+        self.assertContains(response, self.decision.subject)
+
+        response = self.get(reverse('votes:info', args=[self.decision.pk]))
+        self.assertContains(response, "Max Muster1")
+
+        self.decision.cast_vote(self.voters[0], option)
+        response = self.get(reverse('votes:vote', args=[self.decision.pk]))
+        self.assertTrue(response.context['entitled_to_vote'])
+        self.assertTrue(response.context['user_has_voted'])
+
+    def test_vote_status_is_checked_in_one_query(self):
+        self.client.force_login(self.author)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('votes:vote', args=[self.decision.pk]))
+
+        self.assertFalse(response.context['entitled_to_vote'])
+        self.assertFalse(response.context['user_has_voted'])
+        # session, user, decision with vote status and the teams of the navigation
+        self.assertEqual(len(queries), 4)
+
+
+class BenchmarkTests(TestCase):
+    def test_every_route_is_measured(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = f"{directory}/benchmark.json"
+            call_command('benchmark', '--reuse-db', '--scale', '0.01', '--repeat', '2', '--output', output,
+                         stdout=StringIO())
+            with open(output) as file:
+                results = json.load(file)
+
+            self.assertEqual(Decision.objects.count(), 50)
+            self.assertIn('votes:decisions', results['routes'])
+            self.assertIn('mentoring:mentor-create', results['routes'])
+            for name, route in results['routes'].items():
+                self.assertIn(route['status'], [200, 204], name)
+
+            # a baseline with fewer queries fails the run
+            results['routes']['votes:decisions']['queries'] -= 1
+            with open(output, 'w') as file:
+                json.dump(results, file)
+            with self.assertRaisesMessage(CommandError, "votes:decisions"):
+                call_command('benchmark', '--reuse-db', '--repeat', '2', '--baseline', output,
+                             '--output', f"{directory}/current.json", stdout=StringIO())
+
+
+class SeedDataTests(TestCase):
+    def test_seed_twice(self):
+        pages = caching.make_key(['pages'], 'landing_page')
+        for _ in range(2):
+            call_command('seed_data', '--scale', '0.01', '--password', 'geheim', stdout=StringIO())
+        # cached pages are invalidated too
+        self.assertNotEqual(caching.make_key(['pages'], 'landing_page'), pages)
+
+        self.assertEqual(Decision.objects.count(), 100)
+        self.assertEqual(User.objects.count(), 40)
+        self.assertTrue(User.objects.get(username='user1').check_password('geheim'))
+
+        # tallies and ballots match the votes
+        for decision in Decision.objects.prefetch_related('options'):
+            votes = Vote.objects.filter(option__decision=decision)
+            self.assertEqual(decision.ballots, votes.count())
+            for option in decision.options.all():
+                self.assertEqual(option.tally, votes.filter(option=option).count())
+            self.assertFalse(votes.exclude(user__elections=decision).exists())
+
+        # primary keys continue after the seeded rows
+        self.assertGreater(Team.objects.create(name="Neu", slug='neu').pk, 2)
+
+
+class PurgeCssTests(TestCase):
+    def test_purge(self):
+        css = (
+            '@charset "utf-8";.button,.modal{color:red}.is-warning{color:#ff0}html{margin:0}'
+            '.button:not(.is-text){border:0}@media screen{.modal{display:flex}.button{display:flex}}'
+            '@keyframes spin{from{transform:rotate(0)}}'
+        )
+        self.assertEqual(
+            purge_css.purge(css, {'button', 'is-warning'}),
+            '@charset "utf-8";.button{color:red}.is-warning{color:#ff0}html{margin:0}'
+            '.button:not(.is-text){border:0}@media screen{.button{display:flex}}'
+            '@keyframes spin{from{transform:rotate(0)}}',
+        )
+
+    def test_used_classes(self):
+        used = purge_css.used_classes(source_files(exclude=[purge_css.__file__]))
+        self.assertIn('navbar-burger', used)
+        # from is-{{ decision.state.color }} and has-text-{{ decision.state.color }} of the templates
+        self.assertIn('is-warning', used)
+        self.assertIn('has-text-success', used)
+        self.assertNotIn('modal', used)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('purge_css', '--output', directory, stdout=StringIO())
+            with open(f"{directory}/{purge_css.STYLESHEET}") as file:
+                css = file.read()
+
+        self.assertTrue(css.startswith('/*! bulma.io'))
+        self.assertIn('.navbar-burger', css)
+        self.assertNotIn('.modal', css)
+
+
+class IconTests(DecisionTestMixin, TestCase):
+    def test_used_icons(self):
+        icons = used_icons(source_files())
+        for name in ['clock', 'vote-yea', 'lock', 'user-secret', 'copy', 'sticky-note', 'cloud']:
+            self.assertIn(('fas', name), icons)
+
+    def test_render(self):
+        author, voter = self.create_users(2)
+        self.create_decision(author, [voter])
+        self.client.force_login(voter)
+
+        response = self.client.get(reverse('votes:decisions'))
+        self.assertContains(response, '<symbol id="fas-vote-yea" viewBox="0 0 640 512">', count=1)
+        self.assertContains(response, '<svg class="svg-inline--fa fa-vote-yea" viewBox="0 0 640 512"')
+        self.assertContains(response, '<use href="#fas-vote-yea"></use>')
+        self.assertNotContains(response, 'fontawesome')
+
+    def test_sprite_is_built_once(self):
+        get_sprite.cache_clear()
+        self.addCleanup(get_sprite.cache_clear)
+        with tempfile.TemporaryDirectory() as directory, override_settings(ICON_SPRITE=f"{directory}/icons.svg"):
+            with self.assertLogs('votes.icons', 'WARNING') as logs:
+                for _ in range(3):
+                    Template('{% load icons %}{% icon_sprite %}').render(Context())
+
+        self.assertEqual(len(logs.records), 1)
+
+    def test_unknown_icon(self):
+        with self.assertRaises(TemplateSyntaxError):
+            Template('{% load icons %}{% icon "fas fa-poo" %}').render(Context())
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('build_icons', '--output', f"{directory}/icons.svg", stdout=StringIO())
+            with open(f"{directory}/icons.svg") as file:
+                sprite = file.read()
+
+        self.assertEqual(sprite, build_sprite())
+        self.assertEqual(sprite.count('<symbol'), 7)
+
+
+class SyncStaticTests(TestCase):
+    def setUp(self):
+        self.sources = tempfile.TemporaryDirectory()
+        self.root = tempfile.TemporaryDirectory()
+        for name in ['style.css', 'app.js']:
+            with open(f"{self.sources.name}/{name}", 'w') as file:
+                file.write(f"/* {name} */\n" * 50)
+
+        settings = override_settings(
+            STATICFILES_DIRS=[self.sources.name],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='faking.storage.CompressedManifestStaticFilesStorage',
+            STATIC_ROOT=self.root.name,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.sources.cleanup)
+        self.addCleanup(self.root.cleanup)
+
+    def sync(self, *args):
+        stdout = StringIO()
+        call_command('sync_static', '--no-input', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_sync(self):
+        self.assertIn("2 static files copied", self.sync())
+        self.assertEqual(self.sync(), "All static files are up to date.\n")
+
+        # the modification time is not compared
+        with open(f"{self.sources.name}/style.css", 'a') as file:
+            file.write("body{color:red}")
+        os.utime(f"{self.sources.name}/style.css", (0, 0))
+        self.assertIn("1 static file copied to '{}', 1 unmodified".format(self.root.name), self.sync())
+        with open(f"{self.root.name}/style.css") as file:
+            self.assertTrue(file.read().endswith("body{color:red}"))
+
+        os.remove(f"{self.sources.name}/app.js")
+        self.sync()
+        self.assertFalse(os.path.exists(f"{self.root.name}/app.js"))
+        # hashed copies and their compressed siblings stay for pages rendered before
+        names = os.listdir(self.root.name)
+        self.assertTrue(any(re.fullmatch(r'app\.[0-9a-f]{12}\.js', name) for name in names))
+        self.assertTrue(any(re.fullmatch(r'app\.[0-9a-f]{12}\.js\.gz', name) for name in names))
+
+    def test_baked_sources(self):
+        baked = f"{self.root.name}/sources.json"
+        call_command('sync_static', '--bake', baked)
+        self.assertFalse(os.path.exists(f"{self.root.name}/style.css"))
+
+        self.assertIn("2 static files copied", self.sync('--sources', baked))
+        os.remove(f"{self.sources.name}/app.js")
+        # the sources are not read at all
+        self.assertEqual(self.sync('--sources', baked), "All static files are up to date.\n")
+
+
+class CachingTests(DecisionTestMixin, TestCase):
+    BACKENDS = [
+        {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'},
+    ]
+
+    def assertBumps(self, namespace, change):
+        before = caching.make_key([namespace], 'value')
+        change()
+        self.assertNotEqual(caching.make_key([namespace], 'value'), before, namespace)
+
+    def test_signals(self):
+        for i, backend in enumerate(self.BACKENDS):
+            with self.subTest(backend=backend['BACKEND']), tempfile.TemporaryDirectory() as directory, \
+                    override_settings(CACHES={'default': {**backend, 'LOCATION': directory}}):
+                author, voter = self.create_users(2, prefix=f'user{i}-')
+                team = Team.objects.create(name=f"Team {i}", slug=f'team-{i}')
+
+                self.assertBumps('teams', lambda: team.save())
+                self.assertBumps('memberships', lambda: Membership.objects.create(team=team, user=voter))
+                self.assertBumps('users', lambda: voter.save())
+                decision = self.create_decision(author, [])
+                self.assertBumps('decisions', lambda: decision.voters.add(voter))
+                self.assertBumps('votes', lambda: decision.cast_vote(voter, decision.options.first()))
+                invitation = Invitation.objects.create(token=f'token-{i}', creator=author, expiry=timezone.now())
+                self.assertBumps('invitations', lambda: invitation.teams.add(team))
+                self.assertBumps('invitations', lambda: invitation.delete())
+
+    def test_cascades_stay_fast(self):
+        for model in [Session, Message, Decision.voters.through]:
+            self.assertTrue(Collector('default').can_fast_delete(model.objects.all()), model)
+
+    def test_cascade_bumps_once(self):
+        author, *voters = self.create_users(5)
+        decision = self.create_decision(author, voters)
+        for voter in voters:
+            decision.cast_vote(voter, decision.options.first())
+
+        caching.make_key(['votes'], 'value')
+        [before] = caching.get_versions(['votes'])
+        decision.delete()
+        [after] = caching.get_versions(['votes'])
+        self.assertEqual(after, before + 1)
+
+    def test_bulk_updates(self):
+        author, voter = self.create_users(2)
+        self.create_decision(author, [voter], start=timezone.now() + timedelta(hours=1))
+        self.assertBumps('decisions', lambda: Decision.objects.advance(timezone.now() + timedelta(minutes=90)))
+
+    def test_values_depend_on_all_namespaces(self):
+        key = caching.make_key(['memberships', 'users'], 'roster', 1)
+        self.assertRegex(key, r'^votes:memberships\.\d+:users\.\d+:roster:1$')
+
+        caching.bump('decisions')
+        self.assertEqual(caching.make_key(['memberships', 'users'], 'roster', 1), key)
+        caching.bump('users')
+        self.assertNotEqual(caching.make_key(['memberships', 'users'], 'roster', 1), key)
+
+    def test_evicted_version_does_not_restart(self):
+        key = caching.make_key(['teams'], 'value')
+        cache.delete(caching.version_key('teams'))
+        time.sleep(0.001)
+        self.assertNotEqual(caching.make_key(['teams'], 'value'), key)
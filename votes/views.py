@@ -1,17 +1,51 @@
 import secrets
 
+from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
 from django.utils import timezone
+from django.views.decorators.http import condition
 from django.views.generic import ListView, DetailView, TemplateView
+from django.views.generic.detail import BaseDetailView
 from django.views.generic.edit import FormView, CreateView
 from secrets import token_urlsafe
 
-from .forms import DecisionForm, VoteForm, InvitationForm, JoinTeamForm, RegistrationForm
-from .models import Decision, Option, Invitation, Team, Membership
+from .forms import AgendaImportForm, DecisionForm, VoteForm, InvitationForm, JoinTeamForm, RegistrationForm
+from .models import Decision, Invitation, Team, Membership, Snapshot, get_visible_user_ids
+from .pagination import KeysetPaginationMixin
+from .pool import in_pool
+
+
+def async_view(view):
+    """Serve a sync read-only view from an async one, so that it runs in the thread pool under ASGI.
+
+    Django 3.1 runs all sync views of an ASGI server on one shared thread and has no
+    async ORM yet. A wrapped view only holds a pool thread while it queries and
+    renders. The site is deployed with uvicorn; under WSGI, e.g. ``runserver`` in
+    development, Django starts an event loop per request to call the wrapper and the
+    view runs back on the request thread, which only costs time.
+    """
+    run = in_pool(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if isinstance(request, ASGIRequest):
+            return await run(request, *args, **kwargs)
+        return await sync_to_async(view, thread_sensitive=True)(request, *args, **kwargs)
+
+    return wrapper
 
 
 class DecisionCreate(LoginRequiredMixin, FormView):
@@ -26,28 +60,55 @@ class DecisionCreate(LoginRequiredMixin, FormView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        form.save()
-        for text in ["Dafür", "Dagegen", "Enthaltung"]:
-            option = Option.objects.create(decision=form.instance, text=text)
-            option.save()
+        with transaction.atomic():
+            decision = form.save()
+            decision.create_options()
+        return super().form_valid(form)
+
+
+class AgendaImport(LoginRequiredMixin, FormView):
+    template_name = 'votes/import.html'
+    form_class = AgendaImportForm
+    success_url = reverse_lazy('votes:owned')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        Decision.objects.bulk_import(
+            form.cleaned_data['subject_list'],
+            author=self.request.user,
+            template=form.cleaned_data['template'],
+            voter_ids=form.cleaned_data['voters'],
+            start=form.cleaned_data['start'],
+            end=form.cleaned_data['end'],
+        )
         return super().form_valid(form)
 
 
 class DecisionInfo(LoginRequiredMixin, DetailView):
     template_name = 'votes/info.html'
-    model = Decision
+    queryset = Decision.objects.with_participation().select_related('author').prefetch_related('voters', 'options')
     form_class = VoteForm
 
 
-class Decisions(LoginRequiredMixin, ListView):
+def decision_live(request, pk):
+    # the event stream is served by votes.live under ASGI, 204 stops an EventSource from reconnecting
+    return HttpResponse(status=204)
+
+
+class Decisions(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Decision
     template_name = 'votes/list.html'
+    keyset = ('start', 'id')
 
     def get_queryset(self):
         decisions = Decision.objects.filter(
             voters__in=[self.request.user],
             end__gt=timezone.now(),
-        ).order_by('start')
+        )
         return decisions
 
     def get_context_data(self, **kwargs):
@@ -56,12 +117,13 @@ class Decisions(LoginRequiredMixin, ListView):
         return context
 
 
-class DecisionsOwned(LoginRequiredMixin, ListView):
+class DecisionsOwned(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Decision
     template_name = 'votes/list.html'
+    keyset = ('-end', '-id')
 
     def get_queryset(self):
-        return Decision.objects.filter(author=self.request.user).order_by('-end')
+        return Decision.objects.filter(author=self.request.user)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -69,10 +131,13 @@ class DecisionsOwned(LoginRequiredMixin, ListView):
         return context
 
 
-class Results(LoginRequiredMixin, ListView):
+class Results(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Decision
     template_name = 'votes/list.html'
-    queryset = Decision.objects.filter(end__lt=timezone.now()).order_by('-end')
+    keyset = ('-end', '-id')
+
+    def get_queryset(self):
+        return Decision.objects.filter(end__lt=timezone.now())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -80,15 +145,49 @@ class Results(LoginRequiredMixin, ListView):
         return context
 
 
-class ResultInfo(LoginRequiredMixin, DetailView):
-    template_name = 'votes/info.html'
+def result_etag(request, pk):
+    etag, _ = Snapshot.get_validators(pk)
+    return etag
+
+
+def result_last_modified(request, pk):
+    _, created = Snapshot.get_validators(pk)
+    return created
+
+
+class ResultMixin(LoginRequiredMixin):
     model = Decision
 
-    def get(self, request, *args, **kwargs):
-        decision = get_object_or_404(Decision, pk=self.kwargs['pk'])
+    def get_object(self, queryset=None):
+        decision = super().get_object(queryset)
         if decision.state()['code'] != 'closed':
             raise PermissionDenied()
-        return super().get(request, *args, **kwargs)
+        self.snapshot = decision.freeze()
+        return decision
+
+
+class ResultInfo(ResultMixin, DetailView):
+    template_name = 'votes/result.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['snapshot'] = self.snapshot
+        context['result'] = self.snapshot.result
+        return context
+
+
+@method_decorator(condition(etag_func=result_etag, last_modified_func=result_last_modified), name='get')
+class ResultExport(ResultMixin, BaseDetailView):
+    """The frozen result as JSON, with validators for conditional requests.
+
+    The HTML page has none, because its navigation depends on the user and not only on the snapshot.
+    """
+
+    def render_to_response(self, context, **response_kwargs):
+        response = JsonResponse(self.snapshot.data, json_dumps_params={'ensure_ascii': False})
+        response['ETag'] = quote_etag(self.snapshot.etag)
+        response['Last-Modified'] = http_date(self.snapshot.created.timestamp())
+        return response
 
 
 class VoteCreate(LoginRequiredMixin, FormView):
@@ -96,51 +195,41 @@ class VoteCreate(LoginRequiredMixin, FormView):
     form_class = VoteForm
     success_url = reverse_lazy('votes:decisions')
 
-    def get_context_data(self, **kwargs):
-        decision = get_object_or_404(Decision, pk=self.kwargs['pk'])
+    @cached_property
+    def decision(self):
+        return get_object_or_404(Decision.objects.with_vote_status(self.request.user), pk=self.kwargs['pk'])
 
+    def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['decision'] = decision
-        context['entitled_to_vote'] = self.request.user in decision.voters.all()
-        context['user_has_voted'] = self.request.user not in decision.pending_voters()
+        context['decision'] = self.decision
+        context['entitled_to_vote'] = self.decision.entitled_to_vote
+        context['user_has_voted'] = self.decision.user_has_voted
         return context
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['decision'] = Decision.objects.get(pk=self.kwargs['pk'])
+        kwargs['decision'] = self.decision
         return kwargs
 
     def post(self, request, *args, **kwargs):
-        decision = Decision.objects.get(pk=self.kwargs['pk'])
-
-        if decision.state()['code'] != 'open':
+        if self.decision.state()['code'] != 'open':
             # voting not allowed
             raise PermissionDenied()
 
-        if self.request.user not in decision.voters.all():
-            # user not entitled to vote
-            raise PermissionDenied()
-
-        if self.request.user not in decision.pending_voters():
-            # user already voted
-            raise PermissionDenied()
-
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
-        form.instance.user = self.request.user
-        form.save()
+        self.decision.cast_vote(self.request.user, form.cleaned_data['option'])
         return super().form_valid(form)
 
 
-class Invitations(LoginRequiredMixin, ListView):
+class Invitations(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Invitation
     template_name = 'votes/invitations.html'
+    keyset = ('-created', '-id')
 
     def get_queryset(self):
-        return Invitation.objects.exclude(
-            teams__in=Team.objects.exclude(members__exact=self.request.user),
-        ).order_by('-created')
+        return Invitation.objects.visible_to(self.request.user).select_related('creator').prefetch_related('teams')
 
 
 class InvitationCreate(LoginRequiredMixin, FormView):
@@ -160,9 +249,21 @@ class InvitationCreate(LoginRequiredMixin, FormView):
         return super().form_valid(form)
 
 
-class Teams(LoginRequiredMixin, ListView):
+class Teams(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Team
     template_name = 'votes/teams.html'
+    paginate_by = 10
+    keyset = ('created', 'id')
+
+    def get_queryset(self):
+        return Team.objects.prefetch_related(
+            Prefetch('membership_set', queryset=Membership.objects.select_related('user', 'invitation__creator')),
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['visible_user_ids'] = get_visible_user_ids(self.request.user)
+        return context
 
 
 class JoinTeam(LoginRequiredMixin, FormView):
@@ -171,14 +272,8 @@ class JoinTeam(LoginRequiredMixin, FormView):
     success_url = reverse_lazy('votes:invitations')
 
     def form_valid(self, form):
-        invitation = Invitation.objects.get(token=form.cleaned_data['token'])
-        for team in invitation.teams.all():
-            membership = Membership(
-                team=team,
-                user=self.request.user,
-                invitation=invitation,
-            )
-            membership.save()
+        with transaction.atomic():
+            form.invitation.accept(self.request.user)
 
         return super().form_valid(form)
 
@@ -198,22 +293,18 @@ class Registration(CreateView):
         # generate generic password
         secret = token_urlsafe(16)  # TODO drop generic password generation
 
-        # update user profile
-        form.instance.set_password(secret)
-        form.instance.save()
-
-        # join teams
-        invitation = Invitation.objects.get(token=form.cleaned_data['token'])
-        for team in invitation.teams.all():
-            membership = Membership(
-                team=team,
-                user=form.instance,
-                invitation=invitation,
-            )
-            membership.save()
-
-        form.send_email(self.request, secret)
-        return super().form_valid(form)
+        with transaction.atomic():
+            # update user profile
+            self.object = form.save(commit=False)
+            self.object.set_password(secret)
+            self.object.save()
+
+            # join teams
+            form.invitation.accept(self.object)
+
+            form.send_email(self.request, secret)
+
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class RegistrationDone(TemplateView):